@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from ..core.database import get_db
-from ..services.user_service import UserService
+from ..services.user_service import UserService, Principal, cached_principal
+from ..core.concurrency import run_blocking
 from ..core.auth import verify_token
 
 router = APIRouter()
@@ -34,39 +35,46 @@ class AuthResponse(BaseModel):
 class LinkSessionRequest(BaseModel):
     session_id: str
 
+async def _resolve_principal(token: str, db: Session) -> Optional[Principal]:
+    """
+    Decode a token and find its user. The principal cache usually has it,
+    so only a miss costs a db read. None if the token or user is invalid.
+    """
+    try:
+        payload = verify_token(token)
+        user_id = int(payload["sub"])
+    except Exception:
+        return None
+    
+    principal = cached_principal(user_id)
+    if principal is None:
+        principal = await run_blocking(UserService(db).load_principal, user_id)
+    return principal
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-):
+) -> Principal:
     """Gets the current authenticated user from a token"""
-    try:
-        payload = verify_token(credentials.credentials)
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        user_service = UserService(db)
-        user = user_service.get_user_by_id(int(user_id))
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        return user
-    except Exception:
+    principal = await _resolve_principal(credentials.credentials, db)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
+    
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is disabled"
+        )
+    
+    return principal
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
     db: Session = Depends(get_db)
-):
+) -> Optional[Principal]:
     """
     Get current authenticated user, but dont error if no token.
     this is for endpoints that can be used by both anon and logged-in users
@@ -74,17 +82,10 @@ async def get_current_user_optional(
     if not credentials:
         return None
     
-    try:
-        payload = verify_token(credentials.credentials)
-        user_id = payload.get("sub")
-        if user_id is None:
-            return None
-        
-        user_service = UserService(db)
-        user = user_service.get_user_by_id(int(user_id))
-        return user
-    except Exception:
+    principal = await _resolve_principal(credentials.credentials, db)
+    if principal is None or not principal.is_active:
         return None
+    return principal
 
 @router.post("/register", response_model=AuthResponse)
 async def register(
@@ -96,7 +97,7 @@ async def register(
     
     try:
         # create the user and get a token
-        user, token = user_service.create_user(
+        user, token = await user_service.acreate_user(
             email=request.email,
             password=request.password,
             session_id=request.session_id
@@ -123,7 +124,7 @@ async def login(
     user_service = UserService(db)
     
     try:
-        user, login_token = user_service.authenticate_user(request.email, request.password)
+        user, login_token = await user_service.aauthenticate_user(request.email, request.password)
         
         return AuthResponse(
             access_token=login_token,
@@ -156,7 +157,7 @@ async def link_session_to_user(
     """Link an anonymous session to the current user."""
     user_service = UserService(db)
     
-    success = user_service.link_session_to_user(request.session_id, current_user.id)
+    success = await run_blocking(user_service.link_session_to_user, request.session_id, current_user.id)
     
     if not success:
         raise HTTPException(status_code=400, detail="Failed to link session")
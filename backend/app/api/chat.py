@@ -1,24 +1,66 @@
 """Chat API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import Optional
-import sys
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import anyio
+import asyncio
+import json
+import logging
 from .. import state # Import the shared state
 from ..core.chatbot import Chatbot
 from ..core.settings import get_settings, Settings
-from ..core.database import get_db
+from ..core.database import get_db, SessionLocal
+from ..core.concurrency import run_blocking
+from ..core.deadlines import Deadline
+from ..core.log import bind_session
+from ..core.group_commit import get_writer
 from ..services.session_service import SessionService
+from ..services.memory_service import MemoryService
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SAVE_FAILED_MESSAGE = "Sorry, your message couldn't be saved. Please try again."
+
 # Dependency to get chatbot instance
 def get_chatbot(settings: Settings = Depends(get_settings)):
-    # This function depends on get_settings
-    if state.chatbot_instance is None:
-        # This part is now less likely to fail, but good for safety
-        state.chatbot_instance = Chatbot(api_key=settings.gemini_api_key)
-    return state.chatbot_instance
+    # This function depends on get_settings. Normally the chatbot was
+    # already built by the startup warm-up, otherwise it's made lazily here
+    return state.get_or_create_chatbot(settings.gemini_api_key)
+
+def _memory_service(db: Session) -> MemoryService:
+    """Make a memory service with the configured budgets."""
+    settings = get_settings()
+    return MemoryService(
+        db,
+        token_budget=settings.memory_token_budget,
+        max_messages=settings.memory_max_messages,
+        summary_token_budget=settings.summary_token_budget,
+        compact_batch=settings.memory_compact_batch
+    )
+
+async def compact_memory(chatbot: Chatbot, session_id: str):
+    """
+    Fold old turns into the session summary. Runs after the response is
+    sent, with its own db session since the request's is closed by then.
+    """
+    db = SessionLocal()
+    try:
+        memory = _memory_service(db)
+        overflow = await run_blocking(memory.get_overflow, session_id)
+        if not overflow:
+            return
+        summary = await chatbot.asummarize(overflow["summary"], overflow["turns"])
+        if summary:
+            await run_blocking(memory.save_summary, session_id, summary, overflow["through_id"])
+    except Exception:
+        logger.exception("Error compacting memory for session %s", session_id)
+    finally:
+        db.close()
 
 class ChatRequest(BaseModel):
     message: str
@@ -27,11 +69,15 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     session_id: str
-    history: list
+    # Just this turn's messages, the client already has the rest
+    messages: List[Dict[str, Any]]
+    # Id of the newest message, pass as `after` to /session/{id}/history
+    cursor: Optional[int] = None
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest, 
+    background_tasks: BackgroundTasks,
     chatbot: Chatbot = Depends(get_chatbot),
     db: Session = Depends(get_db),
     x_session_id: Optional[str] = Header(None)
@@ -39,6 +85,8 @@ async def chat(
     """Main chat handler"""
     if not request.message:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
+    # Everything below, session lookup included, counts against it
+    deadline = Deadline(chatbot.request_timeout)
     
     try:
         # Init session service
@@ -46,34 +94,159 @@ async def chat(
         
         # Get or create session... prioritize request body, then header
         session_id = request.session_id or x_session_id
-        session_id = session_service.get_or_create_session(session_id)
+        # DB calls are blocking, so they run in the shared executor.
+        # No need to touch last_activity, saving the turn does that
+        session_id = await run_blocking(session_service.get_or_create_session, session_id, touch=False)
+        bind_session(session_id)
         
-        # Save user message
-        session_service.save_message(session_id, "user", request.message)
+        # Load the conversation so far (before this message is saved)
+        conversation = await run_blocking(_memory_service(db).load, session_id)
+        # Hand the connection back to the pool while Gemini works, the turn
+        # gets saved on its own session, so a chat only ever holds one
+        await run_blocking(db.close)
         
         # Get chatbot response
-        response = chatbot.chat(request.message)
+        response = await chatbot.achat(request.message, conversation, deadline)
         
-        # Save assistant response
-        session_service.save_message(session_id, "assistant", response)
+        # Save the user message and the response in one go. Raises if it
+        # couldn't be saved, that's a 500 rather than a turn silently lost
+        user_message_id, assistant_message_id = await record_turn(session_id, request.message, response)
         
-        # Get updated chat history from db
-        chat_history = session_service.get_chat_history(session_id)
+        # Summarize older turns once the response is out
+        background_tasks.add_task(compact_memory, chatbot, session_id)
         
-        # Convert to the format frontend expects
-        history = []
-        for msg in chat_history:
-            history.append({
-                "role": msg["role"],
-                "parts": [{"text": msg["content"]}]
-            })
+        # Only send back what's new, no need to re-read the whole history
+        now = datetime.utcnow().isoformat()
+        messages = [
+            {"id": user_message_id, "role": "user", "content": request.message, "timestamp": now},
+            {"id": assistant_message_id, "role": "assistant", "content": response, "timestamp": now}
+        ]
         
         return ChatResponse(
             response=response, 
             session_id=session_id,
-            history=history
+            messages=messages,
+            cursor=assistant_message_id or user_message_id
         )
         
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}", file=sys.stderr)
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        logger.exception("Error in chat endpoint")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _save_turn(session_id: str, user_content: str, assistant_content: Optional[str]):
+    """Save a turn with its own db session. Raises if it couldn't be saved."""
+    db = SessionLocal()
+    try:
+        user_message_id, assistant_message_id = SessionService(db).record_turn(
+            session_id, user_content, assistant_content
+        )
+        if user_message_id is None:
+            raise RuntimeError("Chat turn could not be saved")
+        return user_message_id, assistant_message_id
+    finally:
+        db.close()
+
+async def record_turn(session_id: str, user_content: str, assistant_content: Optional[str]):
+    """
+    Save a chat turn in a single transaction and return the message ids.
+    With group commit on, the turn goes to the background writer instead
+    and gets committed together with other requests' turns (we still wait
+    for that commit). Raises if the turn couldn't be saved.
+    """
+    writer = get_writer()
+    if writer is None:
+        return await run_blocking(_save_turn, session_id, user_content, assistant_content)
+    
+    future = writer.submit(
+        lambda db: SessionService(db).add_turn(session_id, user_content, assistant_content)
+    )
+    return await asyncio.wrap_future(future)
+
+async def _persist_turn(session_id: str, user_content: str, assistant_content: Optional[str]) -> bool:
+    """
+    Save a streamed turn, shielded so a disconnect-triggered cancel can't
+    skip the save. Returns whether it got saved.
+    """
+    with anyio.CancelScope(shield=True):
+        try:
+            await record_turn(session_id, user_content, assistant_content)
+            return True
+        except Exception:
+            logger.exception("Error saving turn for session %s", session_id)
+            return False
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    chatbot: Chatbot = Depends(get_chatbot),
+    db: Session = Depends(get_db),
+    x_session_id: Optional[str] = Header(None)
+):
+    """
+    Streaming chat handler using Server-Sent Events.
+    Sends a "metadata" event with the retrieved sources first, then "token"
+    events as Gemini produces them and a final "done" event.
+    """
+    if not request.message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    deadline = Deadline(chatbot.request_timeout)
+    
+    try:
+        session_service = SessionService(db)
+        session_id = request.session_id or x_session_id
+        session_id = await run_blocking(session_service.get_or_create_session, session_id, touch=False)
+        bind_session(session_id)
+        conversation = await run_blocking(_memory_service(db).load, session_id)
+        # Don't hold a pooled connection for the whole stream
+        await run_blocking(db.close)
+    except Exception as e:
+        logger.exception("Error in chat stream endpoint")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        parts = []
+        saved = False
+        try:
+            yield _sse("session", {"session_id": session_id})
+            async for event in chatbot.achat_stream(request.message, conversation, deadline):
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected from stream for session %s", session_id)
+                    break
+                
+                if event["type"] == "token":
+                    parts.append(event["text"])
+                    yield _sse("token", {"text": event["text"]})
+                elif event["type"] == "error":
+                    # Replace whatever we had with the fallback message
+                    parts = [event["text"]]
+                    yield _sse("error", {"text": event["text"]})
+                else:
+                    yield _sse(event["type"], {k: v for k, v in event.items() if k != "type"})
+            else:
+                # Save before "done", so the client hears about a failed save
+                saved = True
+                response = "".join(parts)
+                if await _persist_turn(session_id, request.message, response if parts else None):
+                    yield _sse("done", {"session_id": session_id, "response": response})
+                else:
+                    yield _sse("error", {"text": SAVE_FAILED_MESSAGE})
+        finally:
+            # Persist the turn with whatever got generated, even if the
+            # client went away or the stream broke off
+            if not saved:
+                await _persist_turn(session_id, request.message, "".join(parts) if parts else None)
+    
+    # Background tasks run once the stream has finished (and been saved)
+    background_tasks.add_task(compact_memory, chatbot, session_id)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks
+    )
@@ -0,0 +1,60 @@
+"""Prometheus metrics endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Iterator
+from .. import state
+from ..core.metrics import REGISTRY, Sample
+from ..core.concurrency import executor_queue_depth
+from ..core.log import dropped_log_records
+from ..core.password_hashing import hashing_stats
+from ..core.group_commit import get_writer
+from ..services.user_service import get_principal_cache
+
+router = APIRouter()
+
+# Circuit breaker states as a number, for alerting on "not closed"
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _cache_samples(name: str, stats) -> Iterator[Sample]:
+    labels = {"cache": name}
+    yield ("ellie_cache_hits_total", "counter", "Cache hits", labels, stats["hits"])
+    yield ("ellie_cache_misses_total", "counter", "Cache misses", labels, stats["misses"])
+    yield ("ellie_cache_hit_rate", "gauge", "Cache hit rate since startup", labels, stats["hit_rate"])
+    yield ("ellie_cache_size", "gauge", "Entries in the cache", labels, stats["size"])
+
+def runtime_samples() -> Iterator[Sample]:
+    """Cache, queue and in-flight numbers read from where they live."""
+    yield from _cache_samples("principal", get_principal_cache().stats())
+
+    yield ("ellie_blocking_queue_depth", "gauge", "Tasks waiting for a blocking pool thread", {}, executor_queue_depth())
+
+    hashing = hashing_stats()
+    yield ("ellie_password_hash_in_flight", "gauge", "Password hashes queued or running", {}, hashing["in_flight"])
+    yield ("ellie_password_hash_queue_wait_max_seconds", "gauge", "Longest wait for the hashing pool", {}, hashing["queue_wait_max"])
+
+    yield ("ellie_log_records_dropped_total", "counter", "Log records dropped because the log queue was full", {}, dropped_log_records())
+
+    writer = get_writer()
+    if writer is not None:
+        yield ("ellie_group_commit_pending", "gauge", "Chat writes waiting for a commit", {}, writer.pending())
+
+    chatbot = state.chatbot_instance
+    if chatbot is None:
+        return
+    for name, stats in chatbot.cache_stats().items():
+        yield from _cache_samples(name, stats)
+    yield ("ellie_embedding_queue_depth", "gauge", "Queries waiting for the embedding batcher", {}, chatbot.vector_store.embedding_queue_depth())
+
+    llm = chatbot.governor.stats()
+    yield ("ellie_llm_in_flight", "gauge", "LLM calls running", {}, llm["in_flight"])
+    yield ("ellie_llm_waiting", "gauge", "LLM calls waiting for a slot", {}, llm["waiting"])
+    yield ("ellie_llm_shed_total", "counter", "LLM calls shed (queue full or circuit open)", {}, llm["shed"])
+    yield ("ellie_llm_retries_total", "counter", "LLM call retries", {}, llm["retries"])
+    yield ("ellie_llm_circuit_state", "gauge", "LLM circuit breaker (0 closed, 1 half open, 2 open)", {}, CIRCUIT_STATES[llm["circuit"]])
+
+REGISTRY.add_collector(runtime_samples)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,10 @@
 """Api endpoints for session management."""
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from ..core.database import get_db
+from ..core.concurrency import run_blocking
 from ..services.session_service import SessionService
 from ..api.auth import get_current_user_optional
 
@@ -28,14 +29,15 @@ async def create_session(
     """Create a new session. Anonymous or linked to a user"""
     service = SessionService(db)
     
+    # DB calls are blocking, so they run in the shared executor
     if current_user:
         # Create session linked to the user
-        session_id = service.create_user_session(current_user.id)
+        session_id = await run_blocking(service.create_user_session, current_user.id)
     else:
         # Create anonymous session
-        session_id = service.create_anonymous_session()
+        session_id = await run_blocking(service.create_anonymous_session)
     
-    session_info = service.get_session_info(session_id)
+    session_info = await run_blocking(service.get_session_info, session_id)
     
     return {
         "session_id": session_id,
@@ -46,7 +48,7 @@ async def create_session(
 async def get_session(session_id: str, db: Session = Depends(get_db)):
     """Get info for a session."""
     service = SessionService(db)
-    session_info = service.get_session_info(session_id)
+    session_info = await run_blocking(service.get_session_info, session_id)
     
     if not session_info:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -63,18 +65,18 @@ async def delete_session(
     service = SessionService(db)
     
     # Check if the session exists
-    session_info = service.get_session_info(session_id)
+    session_info = await run_blocking(service.get_session_info, session_id)
     if not session_info:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # For auth'd users, verify they own the session
     if current_user:
-        session_model = service.get_session_model(session_id)
+        session_model = await run_blocking(service.get_session_model, session_id)
         if session_model and session_model.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized to delete this session")
     
     # Delete it
-    success = service.delete_session(session_id)
+    success = await run_blocking(service.delete_session, session_id)
     
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete session")
@@ -84,41 +86,50 @@ async def delete_session(
 @router.get("/session/{session_id}/history")
 async def get_chat_history(
     session_id: str, 
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Get chat history for a session"""
+    """
+    Get chat history for a session, a page at a time.
+    With no cursor this is the newest messages, pass before=<next_before>
+    to page back through older ones or after=<next_after> for newer ones.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    
     service = SessionService(db)
     
     # Check if session exists first
-    session_info = service.get_session_info(session_id)
+    session_info = await run_blocking(service.get_session_info, session_id)
     if not session_info:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Get chat history
-    messages = service.get_chat_history(session_id, limit)
+    page = await run_blocking(service.get_chat_history_page, session_id, limit, before=before, after=after)
     
     return {
-        "messages": messages,
+        **page,
         "session_info": session_info
     }
 
 @router.get("/sessions/my-chats")
 async def get_my_chat_sessions(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    """Get all chat sessions for the current user, with previews"""
+    """
+    Get the current user's chat sessions with previews, a page at a time.
+    Pass next_cursor from the response as cursor to get the next page.
+    """
     if not current_user:
-        return {"sessions": [], "total": 0}
+        return {"sessions": [], "has_more": False, "next_cursor": None}
     
     service = SessionService(db)
-    sessions = service.get_user_sessions_with_preview(current_user.id)
-    
-    return {
-        "sessions": sessions,
-        "total": len(sessions)
-    }
+    return await run_blocking(service.get_user_sessions_with_preview, current_user.id, limit=limit, cursor=cursor)
 
 @router.delete("/session/{session_id}/history")
 async def clear_chat_history(session_id: str, db: Session = Depends(get_db)):
@@ -0,0 +1,111 @@
+"""Semantic cache for generated answers."""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+import threading
+import time
+
+class SemanticAnswerCache:
+    """
+    Caches LLM answers by query meaning rather than exact text.
+
+    Each entry keeps the query embedding, the ids of the docs retrieved for
+    it and the answer. A new query is a hit when it retrieved the same docs
+    (so the prompt context would be identical) and its embedding is within
+    the cosine threshold of a cached query. Entries are evicted LRU-first
+    when full and expire after the ttl.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float], threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.threshold = threshold
+        # doc ids -> {entry key: (normalized embedding, answer, expires_at)}
+        self._by_context: Dict[Tuple[str, ...], Dict[int, tuple]] = {}
+        # entry key -> doc ids, in LRU order
+        self._lru: "OrderedDict[int, Tuple[str, ...]]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def lookup(self, embedding: np.ndarray, doc_ids: Sequence[str]) -> Optional[str]:
+        """Return a cached answer for a similar query with the same context, if any."""
+        if self.maxsize <= 0:
+            return None
+
+        context = tuple(doc_ids)
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for key, (cached, _, expires_at) in list(self._by_context.get(context, {}).items()):
+                if expires_at is not None and expires_at <= now:
+                    self._remove(key)
+                    continue
+                score = float(np.dot(query, cached))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._lru.move_to_end(best_key)
+            return self._by_context[context][best_key][1]
+
+    def store(self, embedding: np.ndarray, doc_ids: Sequence[str], answer: str):
+        """Cache an answer for a query and its retrieved docs."""
+        if self.maxsize <= 0:
+            return
+
+        context = tuple(doc_ids)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._by_context.setdefault(context, {})[key] = (self._normalize(embedding), answer, expires_at)
+            self._lru[key] = context
+            while len(self._lru) > self.maxsize:
+                oldest = next(iter(self._lru))
+                self._remove(oldest)
+
+    def _remove(self, key: int):
+        """Remove an entry. Caller must hold the lock."""
+        context = self._lru.pop(key, None)
+        if context is None:
+            return
+        entries = self._by_context.get(context, {})
+        entries.pop(key, None)
+        if not entries:
+            self._by_context.pop(context, None)
+
+    def invalidate(self):
+        """Drop everything, e.g. after the knowledge base is reloaded."""
+        with self._lock:
+            self._by_context.clear()
+            self._lru.clear()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._lru),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -2,10 +2,26 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 import os
 
+from .settings import get_settings
+
+def make_password_context(rounds: int) -> CryptContext:
+    """
+    Bcrypt context with a fixed cost. Hashes made with any other cost
+    count as needing an update, so logins rehash them to the current one.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+
 # Password hashing stuff
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = make_password_context(get_settings().bcrypt_rounds)
 
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
@@ -20,6 +36,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password, and rehash it if its hash uses an outdated cost.
+    Returns whether it matched and the new hash (None if no update is needed).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     """Create a new JWT access token."""
     to_encode = data.copy()
@@ -1,70 +1,142 @@
 """The core chatbot implementation."""
 import os
-import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 import google.generativeai as genai
+import asyncio
+import logging
 
 from .settings import get_settings
+from .concurrency import run_blocking
 from .vector_store import VectorStore
+from .answer_cache import SemanticAnswerCache
+from .direct_answers import DirectAnswerStore
+from .context_builder import select_context
+from .deadlines import Deadline, hedged
+from .llm_governor import CircuitBreaker, LLMGovernor, LLMUnavailable
+from .tokens import estimate_tokens
+from .metrics import span
+from ..services.memory_service import ConversationContext
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_MESSAGE = "I'm having trouble generating a response right now. Please try again."
 
 class Chatbot:
     """The main chatbot class with RAG"""
     
-    def __init__(self, api_key: str):
-        """Init the chatbot with an api key."""
+    def __init__(self, api_key: str, vector_store: Optional[VectorStore] = None):
+        """Init the chatbot with an api key, and optionally a ready-made vector store."""
         settings = get_settings()
         if not api_key:
-            print("Error: No API key provided", file=sys.stderr)
+            logger.error("No API key provided")
             raise ValueError("API key is required")
             
-        print(f"Initializing chatbot with API key: {api_key[:10]}...")
+        logger.info("Initializing chatbot")
         self.api_key = api_key
         
         # Config Gemini
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel(settings.gemini_model)
-        print(f"Using Gemini model: {settings.gemini_model}")
+        logger.info("Using Gemini model: %s", settings.gemini_model)
+        
+        # Faster model raced against the main one when it's running late
+        self.fallback_model = None
+        if settings.llm_fallback_model:
+            self.fallback_model = genai.GenerativeModel(settings.llm_fallback_model)
+            logger.info("Using fallback model: %s", settings.llm_fallback_model)
+        self.hedge_after = settings.llm_hedge_after
+        
+        # Time limits for a request as a whole and for each stage
+        self.request_timeout = settings.request_timeout
+        self.embed_timeout = settings.embed_timeout
+        self.retrieve_timeout = settings.retrieve_timeout
+        self.generate_timeout = settings.generate_timeout
         
         # Init vector store for RAG
-        self.vector_store = VectorStore()
+        self.vector_store = vector_store or VectorStore()
+        
+        # Semantic answer cache, so repeat questions skip the LLM.
+        # Cached answers are stale once the knowledge base changes
+        self.answer_cache = SemanticAnswerCache(
+            maxsize=settings.answer_cache_size,
+            ttl=settings.answer_cache_ttl,
+            threshold=settings.answer_cache_threshold
+        )
+        self.vector_store.add_change_listener(self.answer_cache.invalidate)
+        
+        # Ready-made answers for FAQ questions asked (nearly) word for word
+        self.direct_answers = None
+        if settings.direct_answers:
+            self.direct_answers = DirectAnswerStore(settings.direct_answers_path)
+            logger.info("Loaded %d direct answers", len(self.direct_answers))
+        self.direct_answer_threshold = settings.direct_answer_threshold
+        self.direct_answer_margin = settings.direct_answer_margin
+        
+        # What the retrieved docs may add to the prompt
+        self.context_token_budget = settings.context_token_budget
+        self.context_similarity_floor = settings.context_similarity_floor
+        self.context_dedupe_threshold = settings.context_dedupe_threshold
+        
+        # Limits, retries and a circuit breaker around the Gemini calls
+        self.governor = LLMGovernor(
+            max_in_flight=settings.llm_max_in_flight,
+            max_queue=settings.llm_max_queue,
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_backoff_base,
+            backoff_max=settings.llm_backoff_max,
+            breaker=CircuitBreaker(settings.llm_breaker_threshold, settings.llm_breaker_reset)
+        )
         
-        # Convo history
-        self.conversation_history: List[Dict[str, Any]] = []
+    def warmup(self):
+        """Load everything the first request would otherwise pay for."""
+        self.vector_store.warmup()
         
-    def _format_context(self, documents: List[Dict[str, Any]]) -> str:
-        """Formats retrieved docs as context."""
-        if not documents:
+    def _format_context(self, user_message: str, documents: List[Dict[str, Any]]) -> str:
+        """Formats the retrieved docs that fit the context budget."""
+        selected = select_context(
+            user_message,
+            documents,
+            token_budget=self.context_token_budget,
+            similarity_floor=self.context_similarity_floor,
+            dedupe_threshold=self.context_dedupe_threshold
+        )
+        if len(selected) < len(documents):
+            logger.debug("Using %d of %d retrieved documents as context", len(selected), len(documents))
+        if not selected:
             return ""
         
-        context = "Here is some context that might be relevant to the user's question:\n\n"
-        for i, doc in enumerate(documents, 1):
-            context += f"Context {i}:\n"
-            context += f"Source: {doc['metadata'].get('section', 'Unknown')}\n"
-            context += f"Content: {doc['text']}\n\n"
+        parts = ["Here is some context that might be relevant to the user's question:\n"]
+        for i, doc in enumerate(selected, 1):
+            parts.append(
+                f"Context {i}:\n"
+                f"Source: {doc['metadata'].get('section', 'Unknown')}\n"
+                f"Content: {doc['text']}\n"
+            )
+        return "\n".join(parts) + "\n"
+    
+    def _format_history(self, history: Optional[ConversationContext]) -> str:
+        """Formats the conversation so far (summary + recent turns)."""
+        if history is None or history.is_empty():
+            return ""
         
-        return context
+        formatted = ""
+        if history.summary:
+            formatted += f"Summary of the earlier conversation:\n{history.summary}\n\n"
+        if history.turns:
+            formatted += "Recent conversation:\n"
+            for turn in history.turns:
+                speaker = "User" if turn["role"] == "user" else "Ellie"
+                formatted += f"{speaker}: {turn['content']}\n"
+        return formatted
     
-    def chat(self, user_message: str) -> str:
-        """Process a user message and return a response."""
-        try:
-            print(f"Processing message: {user_message}")
-            
-            # 1. Retrieve relevant context
-            print("Searching for relevant documents...")
-            retrieved_docs = self.vector_store.search(user_message, top_k=3)
-            
-            # Debug: show what we got
-            print(f"Retrieved {len(retrieved_docs)} documents:")
-            for i, doc in enumerate(retrieved_docs, 1):
-                section = doc['metadata'].get('section', 'Unknown')
-                question = doc['metadata'].get('question', 'N/A')
-                similarity = doc.get('similarity', 0)
-                print(f"  {i}. Section: {section} | Question: {question} | Similarity: {similarity:.3f}")
-            
-            context = self._format_context(retrieved_docs)
-            
-            # 2. Build the prompt
-            prompt = f"""You are "Ellie," an expert AI assistant for a fintech company. Your persona is helpful, professional, and confident.
+    def _build_prompt(self, user_message: str, context: str, history: Optional[ConversationContext] = None) -> str:
+        """Builds the full prompt sent to Gemini."""
+        conversation = self._format_history(history)
+        if conversation:
+            conversation = f"""Conversation so far (use it to understand follow-up questions):
+{conversation}"""
+        
+        prompt = f"""You are "Ellie," an expert AI assistant for a fintech company. Your persona is helpful, professional, and confident.
 
 Use the following context to answer the user's question.
 
@@ -76,36 +148,327 @@ Use the following context to answer the user's question.
 
 Context:
 {context}
-
+{conversation}
 Question:
 {user_message}
 """
+        logger.debug(
+            "Prompt built",
+            extra={
+                "prompt_tokens": estimate_tokens(prompt),
+                "context_tokens": estimate_tokens(context),
+                "conversation_tokens": estimate_tokens(conversation),
+            }
+        )
+        return prompt
+    
+    def _prepare_prompt(
+        self,
+        user_message: str,
+        documents: List[Dict[str, Any]],
+        history: Optional[ConversationContext] = None
+    ) -> str:
+        """Select the context and build the prompt, timed as one stage."""
+        with span("prompt"):
+            context = self._format_context(user_message, documents)
+            return self._build_prompt(user_message, context, history)
+    
+    def _retrieve(self, user_message: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Retrieve the docs relevant to a message."""
+        retrieved_docs = self.vector_store.search(user_message, top_k=3, timeout=timeout)
+        
+        # Debug dump of what we got, sampled (see LOG_DEBUG_SAMPLE_RATE)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Retrieved %d documents",
+                len(retrieved_docs),
+                extra={
+                    "documents": [
+                        {
+                            "section": doc['metadata'].get('section', 'Unknown'),
+                            "question": doc['metadata'].get('question'),
+                            "similarity": round(doc.get('similarity', 0), 3),
+                        }
+                        for doc in retrieved_docs
+                    ]
+                }
+            )
+        
+        return retrieved_docs
+    
+    async def _aretrieve(self, user_message: str, deadline: Deadline) -> List[Dict[str, Any]]:
+        """
+        Retrieve in the shared executor, within the embed and retrieve
+        budgets. Raises asyncio.TimeoutError if either runs out.
+        """
+        # Embedding first warms the embedding cache the search then hits
+        embed = deadline.stage(self.embed_timeout)
+        await asyncio.wait_for(run_blocking(self.vector_store.embed_query, user_message), embed.remaining())
+        retrieve = deadline.stage(self.retrieve_timeout)
+        return await asyncio.wait_for(
+            run_blocking(self._retrieve, user_message, retrieve.remaining()),
+            retrieve.remaining()
+        )
+    
+    def _direct_answer(self, user_message: str, documents: List[Dict[str, Any]]) -> Optional[str]:
+        """The ready-made answer if the message is clearly one of the retrieved FAQs."""
+        if self.direct_answers is None or not documents:
+            return None
+        # Already embedded (and cached) by the search
+        embedding = self.vector_store.embed_query(user_message)
+        answer = self.direct_answers.match(
+            embedding,
+            [doc["id"] for doc in documents],
+            self.direct_answer_threshold,
+            self.direct_answer_margin
+        )
+        if answer is not None:
+            logger.debug("Direct FAQ answer, skipping Gemini")
+        return answer
+    
+    def _degraded_answer(self, documents: List[Dict[str, Any]]) -> str:
+        """
+        Answer from retrieval alone, for when Gemini is overloaded or down:
+        the best matching FAQ, as is. Falls back to the apology if nothing
+        relevant was retrieved.
+        """
+        relevant = [doc for doc in documents if doc.get("similarity", 0) >= self.context_similarity_floor]
+        if not relevant:
+            return FALLBACK_MESSAGE
+        
+        doc = relevant[0]
+        question = doc["metadata"].get("question")
+        if not question:
+            return f"I can't give you a full answer right now, but this should help:\n\n{doc['text']}"
+        # FAQ docs are "Q: ...\nA: ...", the question goes in as a heading
+        answer = doc["text"].split("\nA: ", 1)[-1]
+        return f"I can't give you a full answer right now, but this should help:\n\n**{question}**\n\n{answer}"
+    
+    async def _agenerate(self, prompt: str, deadline: Deadline) -> str:
+        """
+        Generate with the main model within the generate budget. If it's
+        still running at the hedge point (hedge_after, or half the budget
+        if that's sooner) the fallback model is raced against it.
+        """
+        budget = deadline.stage(self.generate_timeout).remaining()
+        
+        def call(model):
+            return lambda: self.governor.call(lambda: model.generate_content_async(prompt))
+        
+        backup = call(self.fallback_model) if self.fallback_model else None
+        response = await hedged(call(self.model), backup, min(self.hedge_after, budget / 2), budget)
+        return response.text
+    
+    async def _stream_text(self, model, prompt: str) -> AsyncIterator[str]:
+        """Stream a model's response text, holding a governor slot throughout."""
+        # Only the initial call can be retried
+        async with self.governor.slot():
+            response = await self.governor.retrying(lambda: model.generate_content_async(prompt, stream=True))
+            async for chunk in response:
+                # Some chunks (e.g. safety feedback) carry no text
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text:
+                    yield text
+    
+    async def _first_chunk(self, model, prompt: str) -> Tuple[AsyncIterator[str], str]:
+        """Start streaming from a model, returning the stream and its first text."""
+        stream = self._stream_text(model, prompt)
+        try:
+            return stream, await stream.__anext__()
+        except StopAsyncIteration:
+            return stream, ""
+        except BaseException:
+            await stream.aclose()
+            raise
+    
+    def _cached_answer(self, user_message: str, documents: List[Dict[str, Any]]) -> Optional[str]:
+        """Look up a cached answer for a similar question with the same context."""
+        embedding = self.vector_store.embed_query(user_message)
+        answer = self.answer_cache.lookup(embedding, [doc["id"] for doc in documents])
+        if answer is not None:
+            logger.debug("Answer cache hit, skipping Gemini")
+        return answer
+    
+    def _remember_answer(self, user_message: str, documents: List[Dict[str, Any]], answer: str):
+        """Store a generated answer in the semantic cache."""
+        embedding = self.vector_store.embed_query(user_message)
+        self.answer_cache.store(embedding, [doc["id"] for doc in documents], answer)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss stats for all the chatbot's caches."""
+        return {
+            **self.vector_store.cache_stats(),
+            "answer": self.answer_cache.stats(),
+        }
+    
+    def _can_use_answer_cache(self, history: Optional[ConversationContext]) -> bool:
+        """
+        Cached answers ignore the conversation, so they're only safe for the
+        first message of a conversation (a follow-up like "how much is it?"
+        means something different every time).
+        """
+        return history is None or history.is_empty()
+    
+    async def achat(
+        self,
+        user_message: str,
+        history: Optional[ConversationContext] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """
+        Process a user message and return a response. The blocking
+        retrieval runs in the shared executor and Gemini is called with its
+        async client, so the event loop stays free while we wait.
+        
+        Gemini calls go through the governor. If it sheds the call, or the
+        call fails for good or runs out of time, the answer comes from the
+        retrieved docs alone. Without a deadline the request gets
+        request_timeout seconds from now.
+        """
+        deadline = deadline or Deadline(self.request_timeout)
+        retrieved_docs = []
+        try:
+            logger.info("Processing message", extra={"message_chars": len(user_message)})
             
-            # Add user message to history
-            self.conversation_history.append({
-                "role": "user",
-                "parts": [{"text": user_message}]
-            })
+            # 1. Retrieve relevant context
+            retrieved_docs = await self._aretrieve(user_message, deadline)
+            direct = await run_blocking(self._direct_answer, user_message, retrieved_docs)
+            if direct is not None:
+                return direct
+            use_cache = self._can_use_answer_cache(history)
+            if use_cache:
+                cached = await run_blocking(self._cached_answer, user_message, retrieved_docs)
+                if cached is not None:
+                    return cached
             
-            # 3. Generate response
-            print("Sending message to Gemini...")
-            response = self.model.generate_content(prompt)
-            response_text = response.text
-            print(f"Got response: {response_text[:100]}...")
+            # 2. Build the prompt
+            prompt = self._prepare_prompt(user_message, retrieved_docs, history)
             
-            # Add the response to history
-            self.conversation_history.append({
-                "role": "assistant",
-                "parts": [{"text": response_text}]
-            })
+            # 3. Generate response
+            with span("llm"):
+                response_text = await self._agenerate(prompt, deadline)
+            logger.debug("Got response", extra={"response_chars": len(response_text)})
+            if use_cache:
+                await run_blocking(self._remember_answer, user_message, retrieved_docs, response_text)
             
             return response_text
             
-        except Exception as e:
-            error_type = type(e).__name__
-            print(f"Error in chat ({error_type}): {str(e)}", file=sys.stderr)
-            return "I'm having trouble generating a response right now. Please try again."
-    
-    def get_conversation_history(self) -> List[Dict[str, Any]]:
-        """Return the conversation history"""
-        return self.conversation_history 
\ No newline at end of file
+        except LLMUnavailable as e:
+            logger.warning("Gemini unavailable (%s), answering from retrieval only", e.reason)
+            return self._degraded_answer(retrieved_docs)
+        except Exception:
+            logger.exception("Error in chat")
+            return self._degraded_answer(retrieved_docs)
+    
+    async def achat_stream(
+        self,
+        user_message: str,
+        history: Optional[ConversationContext] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message and stream the response.
+            
+        Yields events as dicts with a "type" key:
+        - metadata: the retrieved sources, sent before any tokens
+        - token: a chunk of the response text as Gemini produces it
+        - error: retrieval or generation failed, "text" (the retrieval-only
+          answer, or the apology) replaces anything sent so far
+            
+        If the governor sheds the Gemini call the retrieval-only answer is
+        sent as a token instead. The fallback model is hedged in on the
+        time to the first chunk, and the whole stream has to finish within
+        the generate budget.
+        """
+        logger.info("Processing streamed message", extra={"message_chars": len(user_message)})
+        deadline = deadline or Deadline(self.request_timeout)
+            
+        retrieved_docs = []
+        try:
+            retrieved_docs = await self._aretrieve(user_message, deadline)
+            yield {
+                "type": "metadata",
+                "sources": [
+                    {
+                        "section": doc['metadata'].get('section', 'Unknown'),
+                        "question": doc['metadata'].get('question'),
+                        "similarity": doc.get('similarity', 0)
+                    }
+                    for doc in retrieved_docs
+                ]
+            }
+            
+            direct = await run_blocking(self._direct_answer, user_message, retrieved_docs)
+            if direct is not None:
+                yield {"type": "token", "text": direct}
+                return
+            
+            use_cache = self._can_use_answer_cache(history)
+            if use_cache:
+                cached = await run_blocking(self._cached_answer, user_message, retrieved_docs)
+                if cached is not None:
+                    yield {"type": "token", "text": cached}
+                    return
+            
+            prompt = self._prepare_prompt(user_message, retrieved_docs, history)
+            
+            generate = deadline.stage(self.generate_timeout)
+            budget = generate.remaining()
+            backup = (lambda: self._first_chunk(self.fallback_model, prompt)) if self.fallback_model else None
+            with span("llm"):
+                with span("llm_first_token"):
+                    stream, text = await hedged(
+                        lambda: self._first_chunk(self.model, prompt),
+                        backup,
+                        min(self.hedge_after, budget / 2),
+                        budget,
+                        # The losing stream still holds a governor slot
+                        discard=lambda result: result[0].aclose()
+                    )
+                parts = []
+                try:
+                    while True:
+                        if text:
+                            parts.append(text)
+                            yield {"type": "token", "text": text}
+                        text = await asyncio.wait_for(stream.__anext__(), generate.remaining())
+                except StopAsyncIteration:
+                    pass
+                finally:
+                    await stream.aclose()
+            if use_cache:
+                await run_blocking(self._remember_answer, user_message, retrieved_docs, "".join(parts))
+        except LLMUnavailable as e:
+            logger.warning("Gemini unavailable (%s), answering from retrieval only", e.reason)
+            yield {"type": "token", "text": self._degraded_answer(retrieved_docs)}
+        except Exception:
+            logger.exception("Error in chat stream")
+            yield {"type": "error", "text": self._degraded_answer(retrieved_docs)}
+    
+    async def asummarize(self, previous_summary: Optional[str], turns: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Fold older turns into a conversation's rolling summary.
+        Returns None if Gemini couldn't do it, the caller keeps the old one.
+        """
+        transcript = "\n".join(
+            f"{'User' if turn['role'] == 'user' else 'Ellie'}: {turn['content']}" for turn in turns
+        )
+        prompt = f"""Update the running summary of a customer support conversation between a user and Ellie, a fintech assistant.
+Keep it to a short paragraph. Keep facts the user shared, what they asked about and anything still unresolved. Leave out pleasantries.
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New turns to add:
+{transcript}
+
+Updated summary:"""
+        try:
+            response = await self.governor.call(lambda: self.model.generate_content_async(prompt))
+            return response.text.strip()
+        except Exception:
+            logger.exception("Error summarizing conversation")
+            return None 
\ No newline at end of file
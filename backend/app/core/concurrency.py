@@ -0,0 +1,47 @@
+"""Helpers for running blocking work off the event loop."""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .settings import get_settings
+
+# Shared pool for the blocking stages of a request (embedding, vector
+# queries, db calls). Bounded so a traffic spike queues work instead of
+# spawning unlimited threads.
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the shared blocking executor."""
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.blocking_pool_size,
+            thread_name_prefix="ellie-blocking"
+        )
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking function in the shared executor and await the result.
+    It runs in a copy of the caller's context, so request-scoped state
+    (like the request's timing spans) carries over.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+def executor_queue_depth() -> int:
+    """Number of tasks waiting for a thread in the shared executor."""
+    if _executor is None:
+        return 0
+    return _executor._work_queue.qsize()
+
+def shutdown_executor():
+    """Shut down the shared executor, waiting for running work to finish."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
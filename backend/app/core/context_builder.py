@@ -0,0 +1,120 @@
+"""Token-budgeted context for the prompt."""
+from typing import Any, Dict, List, Set
+import re
+
+from .tokens import estimate_tokens, truncate_to_tokens
+
+# Too common to say anything about whether a passage is relevant
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its "
+    "me my of on or so than that the their there this to was what when where which "
+    "who why will with you your".split()
+)
+
+def _terms(text: str) -> Set[str]:
+    """Content words of a text, for overlap scoring."""
+    return {word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in _STOPWORDS}
+
+def _split_passages(text: str) -> List[str]:
+    """Split a doc into passages: its lines, and long lines into sentences."""
+    passages = []
+    for line in text.splitlines():
+        passages.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", line) if s.strip())
+    return passages
+
+def trim_to_passages(text: str, query_terms: Set[str], max_tokens: int) -> str:
+    """
+    Cut a doc down to max_tokens by keeping its most relevant passages.
+
+    The first passage (the FAQ question, or a title) is always kept, then
+    the passages that share the most words with the query, in their
+    original order. Skipped stretches are marked with "...".
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    passages = _split_passages(text)
+    used = estimate_tokens(passages[0]) if passages else 0
+    if len(passages) < 2 or used > max_tokens:
+        return truncate_to_tokens(text, max_tokens)
+
+    ranked = sorted(
+        range(1, len(passages)),
+        key=lambda i: (-len(_terms(passages[i]) & query_terms), i)
+    )
+    keep = [0]
+    for i in ranked:
+        cost = estimate_tokens(passages[i])
+        if used + cost <= max_tokens:
+            keep.append(i)
+            used += cost
+
+    # Separators add a little, drop the least relevant picks until it fits
+    text = _join_passages(passages, keep)
+    while estimate_tokens(text) > max_tokens and len(keep) > 1:
+        keep.pop()
+        text = _join_passages(passages, keep)
+    if estimate_tokens(text) > max_tokens:
+        return truncate_to_tokens(text, max_tokens)
+    return text
+
+def _join_passages(passages: List[str], keep: List[int]) -> str:
+    """Join the kept passages in order, with "..." where some were skipped."""
+    parts = []
+    previous = -1
+    for i in sorted(keep):
+        if i != previous + 1:
+            parts.append("...")
+        parts.append(passages[i])
+        previous = i
+    if previous != len(passages) - 1:
+        parts.append("...")
+    return " ".join(parts)
+
+def _overlap(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two term sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def select_context(
+    query: str,
+    documents: List[Dict[str, Any]],
+    token_budget: int,
+    similarity_floor: float = 0.0,
+    dedupe_threshold: float = 0.8,
+    min_doc_tokens: int = 40
+) -> List[Dict[str, Any]]:
+    """
+    Pick what goes into the prompt from the retrieved docs, best first.
+
+    Docs below the similarity floor are dropped, as are docs that mostly
+    repeat one already picked (overlapping chunks of the same source).
+    Docs are then added in rank order until the budget runs out, and a doc
+    that doesn't fit whole is trimmed to its most relevant passages as
+    long as at least min_doc_tokens are left for it.
+
+    Returns copies of the picked docs, with "text" trimmed as needed.
+    """
+    query_terms = _terms(query)
+    picked = []
+    picked_terms: List[Set[str]] = []
+    remaining = token_budget
+
+    for doc in documents:
+        if doc.get("similarity", 0) < similarity_floor:
+            continue
+
+        terms = _terms(doc["text"])
+        if any(_overlap(terms, seen) >= dedupe_threshold for seen in picked_terms):
+            continue
+
+        if remaining < min_doc_tokens:
+            break
+        text = trim_to_passages(doc["text"], query_terms, remaining)
+        remaining -= estimate_tokens(text)
+
+        picked.append({**doc, "text": text})
+        picked_terms.append(terms)
+
+    return picked
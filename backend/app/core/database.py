@@ -1,22 +1,60 @@
 """Database config and session stuff"""
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from ..models.database import Base
-import os
+from .migrations import run_migrations
+from .settings import get_settings, Settings
 
-# Database URL. Sqlite for simplicity.
-# Can be changed to postgresql for production
-DATABASE_URL = "sqlite:///./chat_sessions.db"
+def _apply_sqlite_pragmas(engine: Engine, settings: Settings):
+    """
+    Tune every new SQLite connection.
+
+    WAL lets readers run alongside a writer, and with synchronous=NORMAL a
+    commit only fsyncs at checkpoints instead of on every transaction. The
+    busy timeout makes writers wait for the lock rather than fail straight
+    away with "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        # Negative means KB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.close()
+
+def make_engine(settings: Settings) -> Engine:
+    """Create the engine for settings.database_url."""
+    url = settings.database_url
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        _apply_sqlite_pragmas(engine, settings)
+        return engine
+
+    # Server database: pool sized per worker, and check connections before
+    # use so ones dropped by the server or a proxy don't surface as errors
+    return create_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=True,
+    )
 
 # Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = make_engine(get_settings())
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def create_tables():
-    """Create all the database tables."""
+    """Create all the database tables and bring older databases up to date."""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
 
 def get_db():
     """Dependency for getting a database session."""
@@ -24,4 +62,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
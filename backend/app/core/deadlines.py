@@ -0,0 +1,100 @@
+"""Request deadlines and hedged calls."""
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class Deadline:
+    """
+    The time a request has to be done by.
+
+    Created when the request comes in and passed down, so each stage gets
+    its own time limit but never more than what's left of the whole.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, 0 once it has passed."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+    def stage(self, limit: float) -> "Deadline":
+        """The deadline for a stage allowed at most limit seconds."""
+        stage = Deadline(limit)
+        stage.expires_at = min(stage.expires_at, self.expires_at)
+        return stage
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    backup: Optional[Callable[[], Awaitable[T]]],
+    hedge_after: float,
+    timeout: float,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None
+) -> T:
+    """
+    Await primary(), and if it hasn't finished after hedge_after seconds
+    (or has failed) start backup() alongside it. The first to succeed wins
+    and the other is cancelled.
+
+    If the loser had already succeeded too (both finished together, or it
+    got in before it could be cancelled) its result is passed to discard,
+    so things like open streams get closed rather than left to the
+    garbage collector.
+
+    Raises asyncio.TimeoutError if neither succeeds within timeout, or the
+    last error if both fail.
+    """
+    start = time.monotonic()
+    pending = {asyncio.ensure_future(primary())}
+    losers = set()
+    hedge_started = backup is None
+    error: Optional[BaseException] = None
+
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                raise asyncio.TimeoutError()
+            wait = timeout - elapsed
+            if not hedge_started:
+                wait = min(wait, max(0.0, hedge_after - elapsed))
+
+            if pending:
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                if winners:
+                    losers.update(winners[1:])
+                    return winners[0].result()
+
+            if not hedge_started and (not pending or time.monotonic() - start >= hedge_after):
+                reason = "failed" if not pending else f"still running after {hedge_after:.1f}s"
+                logger.info("Primary call %s, hedging with the backup", reason)
+                pending.add(asyncio.ensure_future(backup()))
+                hedge_started = True
+            elif not pending:
+                raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if discard is not None:
+            # Wait for the cancels to land, one may have finished first
+            losers.update(pending)
+            await asyncio.gather(*losers, return_exceptions=True)
+            for task in losers:
+                if task.cancelled() or task.exception() is not None:
+                    continue
+                try:
+                    await discard(task.result())
+                except Exception:
+                    logger.exception("Error discarding a hedged call's result")
@@ -0,0 +1,226 @@
+"""Pre-generated answers for FAQ questions asked near-verbatim."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import google.generativeai as genai
+import numpy as np
+import threading
+import json
+import os
+import logging
+
+from .settings import get_settings
+from .vector_store import document_id
+
+logger = logging.getLogger(__name__)
+
+ANSWER_PROMPT = """You are "Ellie," an expert AI assistant for a fintech company. Your persona is helpful, professional, and confident.
+
+A customer asked exactly this question. Reply to them using only the answer below.
+
+**Core Instructions:**
+- Answer the question directly and concisely.
+- **Do not** mention the FAQ or that you were given an answer. Act as if you already know the information.
+- Format your answer using Markdown for clarity (e.g. lists, bold text).
+
+Question:
+{question}
+
+Answer:
+{answer}
+"""
+
+class DirectAnswerStore:
+    """
+    Sidecar file of ready-made answers, keyed by FAQ doc id.
+
+    Each entry has the FAQ question, the question's embedding and the
+    answer, written by the sync scripts. Doc ids are content hashes, so an
+    edited FAQ gets a new id and its old answer just stops matching. The
+    file is re-read whenever it changes on disk, so a sync reaches
+    running servers without a restart.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self):
+        """Reload the file if it changed since we last read it."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            entries = {}
+            if mtime is not None:
+                with open(self.path, "r") as f:
+                    for doc_id, entry in json.load(f).items():
+                        entry["embedding"] = np.asarray(entry["embedding"], dtype=np.float32)
+                        entries[doc_id] = entry
+            self._entries = entries
+            self._mtime = mtime
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ids(self) -> List[str]:
+        return list(self._entries)
+
+    def set(self, doc_id: str, question: str, embedding: np.ndarray, answer: str):
+        """Add or replace an entry (call save to write it)."""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        self._entries[doc_id] = {
+            "question": question,
+            "embedding": embedding / norm if norm else embedding,
+            "answer": answer,
+        }
+
+    def remove(self, doc_id: str):
+        """Remove an entry (call save to write it)."""
+        self._entries.pop(doc_id, None)
+
+    def save(self):
+        """Write the store atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = {
+            doc_id: {**entry, "embedding": [round(float(x), 6) for x in entry["embedding"]]}
+            for doc_id, entry in self._entries.items()
+        }
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(self.path + ".tmp", self.path)
+        self._mtime = os.stat(self.path).st_mtime
+
+    def match(
+        self,
+        query_embedding: np.ndarray,
+        doc_ids: Sequence[str],
+        threshold: float,
+        margin: float
+    ) -> Optional[str]:
+        """
+        The ready-made answer for a query, if it's unambiguously one of the
+        retrieved FAQs: the query has to be within threshold (cosine) of
+        that FAQ's question and beat the next closest question by margin.
+
+        Questions are compared rather than the retrieval scores, since the
+        indexed text includes the answer and that dilutes the similarity
+        even for a verbatim question.
+        """
+        self._refresh()
+        entries = self._entries
+        candidates = [entries[doc_id] for doc_id in doc_ids if doc_id in entries]
+        if not candidates:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = sorted(
+            ((float(np.dot(query, entry["embedding"])), entry["answer"]) for entry in candidates),
+            key=lambda pair: pair[0],
+            reverse=True
+        )
+
+        best_score, answer = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best_score >= threshold and best_score - runner_up >= margin:
+            return answer
+        return None
+
+def make_answer_generator(model) -> Callable[[Dict[str, Any]], str]:
+    """Turn an FAQ doc into Ellie's answer with a Gemini model."""
+    def generate(doc: Dict[str, Any]) -> str:
+        question = doc["metadata"]["question"]
+        # Docs are "Q: ...\nA: ...", only the answer part is needed
+        answer = doc["text"].split("\nA: ", 1)[-1]
+        response = model.generate_content(ANSWER_PROMPT.format(question=question, answer=answer))
+        return response.text.strip()
+    return generate
+
+def sync_direct_answers(
+    vector_store,
+    documents: Sequence[Dict[str, Any]],
+    store: DirectAnswerStore,
+    generate: Callable[[Dict[str, Any]], str],
+    workers: int = 4
+) -> Dict[str, int]:
+    """
+    Make the store cover exactly the current FAQ docs. Answers are only
+    generated for docs that don't have one yet, so an up to date store
+    costs no LLM calls. Docs whose answer fails to generate are left out
+    and get retried on the next sync.
+    """
+    current = {
+        document_id(doc["text"], doc.get("metadata", {})): doc
+        for doc in documents
+        if doc.get("metadata", {}).get("question")
+    }
+
+    removed = [doc_id for doc_id in store.ids() if doc_id not in current]
+    for doc_id in removed:
+        store.remove(doc_id)
+
+    missing = [doc_id for doc_id in current if doc_id not in store]
+    generated = failed = 0
+    if missing:
+        questions = [current[doc_id]["metadata"]["question"] for doc_id in missing]
+        embeddings = vector_store.encode_batch(questions)
+
+        def safe_generate(doc):
+            try:
+                return generate(doc)
+            except Exception as e:
+                logger.warning("Failed to generate an answer for %r: %s", doc["metadata"]["question"], e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            answers = list(pool.map(safe_generate, [current[doc_id] for doc_id in missing]))
+
+        for doc_id, question, embedding, answer in zip(missing, questions, embeddings, answers):
+            if answer:
+                store.set(doc_id, question, embedding, answer)
+                generated += 1
+            else:
+                failed += 1
+
+    if removed or generated:
+        store.save()
+
+    return {
+        "generated": generated,
+        "removed": len(removed),
+        "failed": failed,
+        "unchanged": len(current) - len(missing),
+    }
+
+def update_direct_answers(vector_store, documents: Sequence[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """
+    Sync the direct answers with Gemini as configured in settings.
+    Returns None if direct answers are off or there's no API key.
+    """
+    settings = get_settings()
+    if not settings.direct_answers or not settings.gemini_api_key:
+        return None
+
+    genai.configure(api_key=settings.gemini_api_key)
+    model = genai.GenerativeModel(settings.gemini_model)
+    return sync_direct_answers(
+        vector_store,
+        documents,
+        DirectAnswerStore(settings.direct_answers_path),
+        make_answer_generator(model),
+        workers=settings.ingest_workers
+    )
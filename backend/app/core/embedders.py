@@ -0,0 +1,108 @@
+"""Text embedding backends."""
+from abc import ABC, abstractmethod
+from typing import List
+import numpy as np
+import os
+
+from .settings import Settings
+
+# The model every backend runs, the index was built with its embeddings
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+class Embedder(ABC):
+    """
+    Interface for turning texts into embeddings.
+
+    encode returns one L2-normalized float32 row per text, so embeddings
+    from different backends of the same model are interchangeable.
+    """
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of texts."""
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average the token embeddings of each text, ignoring padding, and
+    L2-normalize. Same pooling the sentence-transformers model uses.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (pooled / norms).astype(np.float32)
+
+class SentenceTransformerEmbedder(Embedder):
+    """The model on PyTorch, through sentence-transformers."""
+
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = 0):
+        # Imported here so the ONNX backend never loads torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+class OnnxEmbedder(Embedder):
+    """
+    The same model exported to ONNX and run with ONNX Runtime.
+
+    No torch at all, so a worker uses far less memory and starts faster,
+    and the int8 (dynamically quantized) export is a lot quicker on CPU.
+    The model directory comes from scripts/export_onnx_model.py.
+    """
+
+    MODEL_FILE = "model.onnx"
+    QUANTIZED_MODEL_FILE = "model_int8.onnx"
+    TOKENIZER_FILE = "tokenizer.json"
+    # all-MiniLM-L6-v2 was trained on up to 256 tokens
+    MAX_LENGTH = 256
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, self.QUANTIZED_MODEL_FILE if quantized else self.MODEL_FILE)
+        tokenizer_path = os.path.join(model_dir, self.TOKENIZER_FILE)
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} not found, run scripts/export_onnx_model.py first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        # One graph runs at a time per call, parallelism is within ops
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(self.MAX_LENGTH)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        # Exports differ in whether they take token_type_ids
+        feeds = {name: value for name, value in inputs.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+def create_embedder(settings: Settings) -> Embedder:
+    """Create the embedding backend selected in settings."""
+    if settings.embedding_backend == "sentence-transformers":
+        return SentenceTransformerEmbedder(MODEL_NAME, settings.embedding_threads)
+    if settings.embedding_backend == "onnx":
+        return OnnxEmbedder(settings.onnx_model_path, settings.onnx_quantized, settings.embedding_threads)
+    raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
@@ -0,0 +1,60 @@
+"""Micro-batching for query embeddings."""
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+import numpy as np
+
+from .micro_batch import MicroBatchWorker
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests from concurrent callers into batches.
+
+    Callers submit a single text and get a Future back. A worker thread
+    takes the first waiting request, keeps collecting for up to max_wait_ms
+    (or until max_batch_size texts are queued), then runs one encode call
+    for the whole batch and hands each caller its row. Encoding a batch
+    costs about the same as encoding one text on CPU, so under load this
+    multiplies throughput, while a lone request only waits the short deadline.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0
+    ):
+        self.encode_fn = encode_fn
+        self._batches = MicroBatchWorker(self._flush, max_batch_size, max_wait_ms, name="embedding-batcher")
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding. The future resolves to its vector."""
+        future: Future = Future()
+        self._batches.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embed a single text, blocking until its batch is done."""
+        return self.submit(text).result()
+
+    def queue_depth(self) -> int:
+        """Number of texts waiting to be batched."""
+        return self._batches.qsize()
+
+    def close(self):
+        """Stop the worker after it finishes what's queued."""
+        self._batches.close()
+
+    def _flush(self, batch: List[Tuple[str, Future]]):
+        """Encode a batch and resolve its futures."""
+        # Identical texts in the same batch only get encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        rows = {text: vectors[i] for i, text in enumerate(texts)}
+        for text, future in batch:
+            future.set_result(rows[text].copy())
@@ -0,0 +1,104 @@
+"""Group commit for chat persistence."""
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+import threading
+import logging
+
+from .database import SessionLocal
+from .micro_batch import MicroBatchWorker
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+class GroupCommitWriter:
+    """
+    Coalesces database writes from many requests into shared commits.
+
+    A write is a function that takes a db session and adds/flushes rows
+    but doesn't commit. A worker thread takes the first queued write,
+    keeps collecting for up to max_wait_ms (or until max_batch_size writes
+    are queued), runs them all in one transaction and commits once, so a
+    burst of chat turns costs one fsync instead of one each. Each caller
+    gets a Future that resolves to its write's return value once the
+    commit is done. Callers still wait for that commit (it's not
+    write-behind), they just share it, and pay up to max_wait_ms for it.
+
+    If the shared commit fails, the writes are retried one transaction
+    each, so a single bad write only fails its own future.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        max_batch_size: int = 128,
+        max_wait_ms: float = 20.0
+    ):
+        self.session_factory = session_factory
+        self._batches = MicroBatchWorker(self._flush, max_batch_size, max_wait_ms, name="group-commit")
+
+    def submit(self, write: Callable[[Any], Any]) -> Future:
+        """Queue a write. The future resolves to its result after the commit."""
+        future: Future = Future()
+        self._batches.put((write, future))
+        return future
+
+    def pending(self) -> int:
+        """Number of writes waiting for a commit."""
+        return self._batches.qsize()
+
+    def close(self):
+        """Commit everything that's queued, then stop the worker."""
+        self._batches.close()
+
+    def _flush(self, batch: List[Tuple[Callable[[Any], Any], Future]]):
+        """Run a batch of writes and commit them together."""
+        db = self.session_factory()
+        try:
+            try:
+                results = [write(db) for write, _ in batch]
+                db.commit()
+            except Exception as e:
+                logger.warning("Group commit of %d writes failed, retrying them one by one: %s", len(batch), e)
+                db.rollback()
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                return
+
+            for write, future in batch:
+                try:
+                    result = write(db)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            db.close()
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> Optional[GroupCommitWriter]:
+    """Get (or lazily start) the shared writer, or None if group commit is off."""
+    global _writer
+    settings = get_settings()
+    if not settings.group_commit:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(
+                    SessionLocal,
+                    max_batch_size=settings.group_commit_batch_size,
+                    max_wait_ms=settings.group_commit_wait_ms
+                )
+    return _writer
+
+def shutdown_writer():
+    """Flush queued writes and stop the shared writer."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
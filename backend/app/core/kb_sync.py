@@ -0,0 +1,120 @@
+"""Incremental knowledge base sync."""
+from typing import Any, Dict, Iterable, Optional
+import json
+import os
+import logging
+
+from .settings import get_settings, Settings
+from .vector_store import document_id
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+def _index_target(settings: Settings) -> str:
+    """Identify the index a manifest describes, so a stale one is never reused."""
+    if settings.vector_backend == "local":
+        return f"local:{os.path.abspath(settings.local_index_path)}"
+    return f"{settings.vector_backend}:{settings.pinecone_index}"
+
+def document_key(doc: Dict[str, Any]) -> str:
+    """
+    Stable key for where a doc comes from, independent of its content.
+    FAQs are keyed by section + question, anything else can set "source".
+    """
+    metadata = doc.get("metadata", {})
+    if "source" in metadata:
+        return str(metadata["source"])
+    if "question" in metadata:
+        return f"{metadata.get('section', '')}::{metadata['question']}"
+    return doc["text"]
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load a manifest, or an empty one if there isn't one yet."""
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "target": None, "documents": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    """Write the manifest atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def sync_documents(
+    vector_store,
+    documents: Iterable[Dict[str, Any]],
+    manifest_path: Optional[str] = None,
+    progress=None
+) -> Dict[str, Any]:
+    """
+    Make the index match documents, touching only what changed.
+
+    The manifest maps each doc's source key to its id, and ids are SHA-256
+    hashes of the doc content (see document_id). So a doc whose
+    id differs from the manifest is new or edited and gets embedded and
+    upserted, and ids whose source disappeared (or were replaced by an
+    edit) get deleted. Unchanged docs cost nothing.
+
+    Returns counts of added, updated, deleted and unchanged docs, plus the
+    ids that were upserted and deleted.
+    """
+    settings = get_settings()
+    manifest_path = manifest_path or settings.kb_manifest_path
+    target = _index_target(settings)
+
+    manifest = load_manifest(manifest_path)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("target") != target:
+        # Manifest is for a different index (or format), start from scratch
+        logger.warning("Manifest doesn't match the current index, doing a full sync")
+        manifest = {"version": MANIFEST_VERSION, "target": target, "documents": {}}
+
+    previous: Dict[str, str] = manifest["documents"]
+    current: Dict[str, str] = {}
+    to_upsert = []
+    upserted_ids = []
+    added = updated = unchanged = 0
+
+    for doc in documents:
+        key = document_key(doc)
+        doc_id = document_id(doc["text"], doc.get("metadata", {}))
+        if key in current:
+            # Two docs with the same source, tell them apart by content
+            key = f"{key}#{doc_id}"
+        current[key] = doc_id
+
+        if previous.get(key) == doc_id:
+            unchanged += 1
+            continue
+        if key in previous:
+            updated += 1
+        else:
+            added += 1
+        to_upsert.append(doc)
+        upserted_ids.append(doc_id)
+
+    # Anything we had before that's not in the current set goes away
+    current_ids = set(current.values())
+    to_delete = [doc_id for doc_id in previous.values() if doc_id not in current_ids]
+    deleted = sum(1 for key in previous if key not in current)
+
+    if to_upsert:
+        vector_store.add_documents(to_upsert, progress=progress)
+    if to_delete:
+        vector_store.delete_documents(to_delete)
+
+    # Only record the new state once the index has it
+    manifest["documents"] = current
+    save_manifest(manifest_path, manifest)
+
+    return {
+        "added": added,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": unchanged,
+        "upserted_ids": upserted_ids,
+        "deleted_ids": to_delete,
+    }
@@ -0,0 +1,189 @@
+"""Concurrency limits, retries and a circuit breaker for LLM calls."""
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: rate limited or the service having a bad moment
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an LLM error is transient (google.api_core errors carry the HTTP status as code)."""
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS
+
+class LLMUnavailable(Exception):
+    """The LLM call wasn't made: the circuit is open or the queue is full."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing.
+
+    After failure_threshold failures in a row the circuit opens and calls
+    are refused straight away. Once reset_timeout has passed a single
+    probe call is let through: success closes the circuit, failure opens
+    it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("LLM circuit breaker opened after %d failures", self._failures)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def abandon(self):
+        """A call ended without telling us anything (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+class LLMGovernor:
+    """
+    Gatekeeper for calls to the LLM.
+
+    At most max_in_flight calls run at once and at most max_queue more
+    wait for a slot. Past that, and while the circuit breaker is open,
+    calls fail fast with LLMUnavailable so the caller can give a degraded
+    answer instead of piling onto a struggling service. Transient errors
+    (429/5xx) are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_queue: int = 64,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker: CircuitBreaker = None
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self.retries = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the in-flight slots for the duration of a call (or a
+        whole streamed response). Raises LLMUnavailable instead of waiting
+        if the circuit is open or the queue is full.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            raise LLMUnavailable("queue_full")
+        if not self.breaker.allow():
+            self.shed += 1
+            raise LLMUnavailable("circuit_open")
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        except Exception as e:
+            # Only the service being unhealthy counts against it, a bad
+            # request still means it's up
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def retrying(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Await func(), retrying transient errors with backoff and jitter."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                self.retries += 1
+                logger.warning(
+                    "LLM call failed (%s), retry %d/%d in %.2fs",
+                    type(e).__name__, attempt + 1, self.max_retries, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Make an LLM call within the limits, with retries."""
+        async with self.slot():
+            return await self.retrying(func)
+
+    def stats(self) -> Dict[str, Any]:
+        """Load and breaker state for monitoring."""
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+            "retries": self.retries,
+            "circuit": self.breaker.state,
+        }
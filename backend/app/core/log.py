@@ -0,0 +1,182 @@
+"""Structured, non-blocking logging."""
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import copy
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+
+from .settings import Settings
+
+# Set per request by RequestContextMiddleware and the chat endpoints, and
+# added to every record logged while handling that request
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+# Attributes every LogRecord has, anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_traceback_formatter = logging.Formatter()
+
+def bind_session(session_id: Optional[str]):
+    """Tag the rest of the current request's logs with a session id."""
+    session_id_var.set(session_id)
+
+class ContextFilter(logging.Filter):
+    """Copies the request and session ids onto each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps only a fraction of DEBUG records, so per-request dumps (like
+    the retrieved documents) can stay on in production without flooding
+    the logs. Other levels always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno != logging.DEBUG or random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking. If the queue
+    is full the record is dropped (and counted) rather than making the
+    request wait on log I/O.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, the args may change once
+        # we return, but unlike the stdlib version keep the extra fields
+        # for the formatter
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse "logger=LEVEL,other.logger=LEVEL" into a dict."""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(settings: Settings):
+    """
+    Send the app's logs through a bounded queue to a listener thread that
+    writes them to stdout, as JSON lines (or plain text for local dev).
+    Safe to call more than once, later calls are no-ops.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    _handler = DroppingQueueHandler(queue.Queue(settings.log_queue_size))
+    _handler.addFilter(ContextFilter())
+    _handler.addFilter(DebugSampler(settings.log_debug_sample_rate))
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+    # The app's loggers all live under "app", uvicorn keeps its own setup
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [_handler]
+    app_logger.propagate = False
+    app_logger.setLevel(settings.log_level.upper())
+    for name, level in parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+def dropped_log_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+def shutdown_logging():
+    """Write out whatever is still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestContextMiddleware:
+    """
+    Gives each request an id (the caller's X-Request-ID if it sent one),
+    for its log records and echoed back in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        session_token = session_id_var.set(None)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(request_token)
+            session_id_var.reset(session_token)
@@ -0,0 +1,238 @@
+"""Latency spans, Server-Timing and Prometheus-format metrics."""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cache hit to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (name, type, help, labels, value), what collectors report at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+def _escape(value: Any) -> str:
+    """Escape a label value for the text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+class Counter:
+    """A count that only goes up, per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+class Histogram:
+    """Distribution of observed values (latencies), per label combination."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label key: count in each bucket (non-cumulative, +Inf last), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total[0]}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    The app's metrics, rendered in the Prometheus text format.
+
+    Counters and histograms are updated as things happen. State that
+    already lives elsewhere (cache stats, queue depths) is read by
+    collectors when /metrics is scraped instead of being mirrored.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Register a function returning samples to report on each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+
+        # Group collected samples by metric name, HELP/TYPE once each
+        grouped: Dict[str, List[Sample]] = {}
+        for collector in self._collectors:
+            try:
+                for sample in collector():
+                    grouped.setdefault(sample[0], []).append(sample)
+            except Exception:
+                logger.exception("Metrics collector %s failed", getattr(collector, "__name__", collector))
+        for name, samples in grouped.items():
+            _, kind, help, _, _ = samples[0]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for _, _, _, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ellie_stage_duration_seconds",
+    "Time spent in each stage of handling a request",
+    ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ellie_http_request_duration_seconds",
+    "Time to the start of the response, by route",
+    ["method", "route", "status"]
+)
+
+# Stage timings of the current request, in seconds, for Server-Timing
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a stage. It's recorded in the stage histogram and, inside a
+    request, added to that request's Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def timed(stage: str):
+    """Decorator version of span, for (sync) functions."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class ServerTimingMiddleware:
+    """
+    Collects the stage timings of each request into a Server-Timing
+    response header and records the request latency by route.
+
+    Headers go out before the body, so a streamed response only reports
+    the stages that finished before it started streaming (everything
+    still lands in /metrics).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(timings, total).encode("latin-1")))
+                message = {**message, "headers": headers}
+                # The router fills in the matched route, unmatched paths
+                # share one label so they can't blow up the cardinality
+                route = scope.get("route")
+                REQUEST_SECONDS.observe(
+                    total,
+                    method=scope["method"],
+                    route=getattr(route, "path", "unmatched"),
+                    status=message["status"]
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,69 @@
+"""A worker thread that drains a queue in micro-batches."""
+from typing import Any, Callable, List
+import threading
+import queue
+import time
+
+# Sentinel that tells the worker to exit
+_STOP = object()
+
+class MicroBatchWorker:
+    """
+    Hands queued items to a flush function a batch at a time.
+
+    A worker thread takes the first queued item, keeps collecting for up
+    to max_wait_ms (or until max_batch_size items are queued) and calls
+    flush with the batch. Under load batches fill up, while a lone item
+    only waits the short deadline. flush runs on the worker thread and
+    must not raise; callers report results (e.g. through futures) from it.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str
+    ):
+        self.flush = flush
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def put(self, item: Any):
+        """Queue an item for the next batch."""
+        self._queue.put(item)
+
+    def qsize(self) -> int:
+        """Number of items waiting to be batched."""
+        return self._queue.qsize()
+
+    def close(self):
+        """Flush everything that's queued, then stop the worker."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Take whatever is already queued, then wait out the deadline
+                    item = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self.flush(batch)
@@ -0,0 +1,139 @@
+"""Versioned schema migrations."""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import func
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from ..models.database import Base
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping lives outside the models' metadata so create_all never
+# touches it
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+def _add_column(conn: Connection, table_name: str, column_name: str):
+    """Add a model column to an existing table, unless it's already there."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    if column_name in existing:
+        return
+    column = Base.metadata.tables[table_name].c[column_name]
+    col_type = column.type.compile(dialect=conn.dialect)
+    ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {col_type}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    logger.info("Adding column %s.%s", table_name, column_name)
+    conn.execute(text(ddl))
+
+def _create_indexes(conn: Connection, table_name: str):
+    """Create a table's model indexes that don't exist yet."""
+    for index in Base.metadata.tables[table_name].indexes:
+        index.create(conn, checkfirst=True)
+
+def _session_stats(conn: Connection):
+    """Denormalized message count, preview and last message time on sessions."""
+    for column_name in ("message_count", "preview", "last_message_at"):
+        _add_column(conn, "sessions", column_name)
+    conn.execute(text("""
+        UPDATE sessions SET
+            message_count = (
+                SELECT COUNT(*) FROM chat_messages WHERE chat_messages.session_id = sessions.id
+            ),
+            last_message_at = (
+                SELECT MAX(created_at) FROM chat_messages WHERE chat_messages.session_id = sessions.id
+            ),
+            preview = (
+                SELECT CASE WHEN LENGTH(content) > 50 THEN SUBSTR(content, 1, 50) || '...' ELSE content END
+                FROM chat_messages
+                WHERE chat_messages.session_id = sessions.id AND chat_messages.role = 'user'
+                ORDER BY chat_messages.id
+                LIMIT 1
+            )
+    """))
+
+def _session_summary(conn: Connection):
+    """Rolling conversation summary on sessions."""
+    _add_column(conn, "sessions", "summary")
+    _add_column(conn, "sessions", "summary_through_id")
+
+def _chat_indexes(conn: Connection):
+    """Indexes for history pages and the sidebar listing."""
+    _create_indexes(conn, "chat_messages")
+    _create_indexes(conn, "sessions")
+
+# Append only: never edit or reorder a migration once it has shipped.
+# Migrations also run on fresh databases right after create_all, so they
+# have to be no-ops when the schema is already up to date.
+MIGRATIONS = [
+    (1, "session_stats", _session_stats),
+    (2, "session_summary", _session_summary),
+    (3, "chat_indexes", _chat_indexes),
+]
+
+# Arbitrary, just has to be the same for every process
+_POSTGRES_LOCK_KEY = 7_316_044_201
+
+def _versions(conn: Connection) -> List[int]:
+    return [row[0] for row in conn.execute(schema_migrations.select().order_by(schema_migrations.c.version))]
+
+@contextmanager
+def _locked(engine: Engine) -> Iterator[Connection]:
+    """
+    A transaction that holds the migration lock, so workers starting
+    together don't apply the same migration twice. SQLite takes the write
+    lock up front with BEGIN IMMEDIATE, Postgres an advisory lock that's
+    released on commit. Other databases run unlocked.
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _POSTGRES_LOCK_KEY})
+        _meta.create_all(bind=conn)
+        yield conn
+        conn.commit()
+
+def applied_versions(engine: Engine) -> List[int]:
+    """Versions already applied to this database."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return []
+        return _versions(conn)
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    Apply the migrations this database hasn't seen yet, in order.
+
+    Each migration and its schema_migrations row commit in one transaction,
+    so a failure leaves the database at the last good version and the
+    next startup picks up from there. That transaction holds the migration
+    lock and re-reads the applied versions, so when several workers start
+    at once each migration is applied by exactly one of them. Returns the
+    versions this call applied.
+    """
+    done = set(applied_versions(engine))
+    if all(version in done for version, _, _ in MIGRATIONS):
+        return []
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with _locked(engine) as conn:
+            # Another worker may have got there while we waited for the lock
+            if version in _versions(conn):
+                continue
+            logger.info("Applying migration %d: %s", version, name)
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+        applied.append(version)
+    return applied
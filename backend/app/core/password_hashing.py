@@ -0,0 +1,120 @@
+"""Password hashing off the event loop."""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
+
+from .auth import hash_password, verify_and_update_password
+from .settings import get_settings
+
+def _timed(func: Callable[..., Any], *args) -> Tuple[Any, float]:
+    """Run func in the worker process and report how long it took there."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+class HashingStats:
+    """
+    Counters for the hashing pool. Queue wait is the time a hash spent
+    waiting for a free process, i.e. the total latency minus the hashing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, elapsed: float, hash_time: Optional[float]):
+        with self._lock:
+            self.in_flight -= 1
+            if hash_time is None:
+                return
+            wait = max(elapsed - hash_time, 0.0)
+            self.completed += 1
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.hash_time_total += hash_time
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "queue_wait_avg": self.queue_wait_total / self.completed if self.completed else 0.0,
+                "queue_wait_max": self.queue_wait_max,
+                "hash_time_avg": self.hash_time_total / self.completed if self.completed else 0.0,
+            }
+
+# Bcrypt is pure CPU for 100ms+ per call, so it runs in its own small
+# process pool. The pool size caps how many hashes run at once, the rest
+# queue without holding up the event loop or the blocking thread pool.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_stats = HashingStats()
+
+def get_hashing_pool() -> ProcessPoolExecutor:
+    """Get (or lazily create) the password hashing pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawn rather than fork, forking a process that already
+                # runs threads can deadlock the child
+                _pool = ProcessPoolExecutor(
+                    max_workers=get_settings().password_hash_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+async def _run_hashing(func: Callable[..., Any], *args) -> Any:
+    """Run a hashing function in the pool, recording queue wait and hash time."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    hash_time = None
+    _stats.started()
+    try:
+        result, hash_time = await loop.run_in_executor(get_hashing_pool(), _timed, func, *args)
+        return result
+    finally:
+        _stats.finished(time.perf_counter() - start, hash_time)
+
+async def ahash_password(password: str) -> str:
+    """Hash a password in the hashing pool."""
+    return await _run_hashing(hash_password, password)
+
+async def averify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool. Returns whether it matched and
+    a new hash if the stored one uses an outdated cost.
+    """
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+def warm_hashing_pool():
+    """
+    Start the pool's processes now, so the first logins don't pay for
+    spawning them and importing bcrypt. Blocks until they're up.
+    """
+    pool = get_hashing_pool()
+    futures = [pool.submit(hash_password, "warmup") for _ in range(get_settings().password_hash_workers)]
+    for future in futures:
+        future.result()
+
+def hashing_stats() -> Dict[str, Any]:
+    """Queue wait, hash time and in-flight counts for monitoring."""
+    return _stats.snapshot()
+
+def shutdown_hashing_pool():
+    """Shut down the hashing pool."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
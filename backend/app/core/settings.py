@@ -12,6 +12,73 @@ class Settings(BaseModel):
     pinecone_cloud: str = "aws"
     pinecone_region: str = "us-east-1"
     gemini_model: str = "gemini-2.5-pro"
+    blocking_pool_size: int = 32
+    eager_warmup: bool = True
+    vector_backend: str = "pinecone"
+    local_index_path: str = "./data/vector_index"
+    embedding_cache_size: int = 1024
+    embedding_cache_ttl: float = 3600
+    result_cache_size: int = 0
+    result_cache_ttl: float = 300
+    answer_cache_size: int = 512
+    answer_cache_ttl: float = 3600
+    answer_cache_threshold: float = 0.95
+    embedding_batching: bool = True
+    embedding_batch_size: int = 32
+    embedding_batch_wait_ms: float = 2.0
+    ingest_batch_size: int = 256
+    ingest_upsert_batch_size: int = 100
+    ingest_workers: int = 4
+    ingest_max_retries: int = 3
+    kb_manifest_path: str = "./data/kb_manifest.json"
+    memory_token_budget: int = 1000
+    memory_max_messages: int = 20
+    summary_token_budget: int = 300
+    memory_compact_batch: int = 10
+    database_url: str = "sqlite:///./chat_sessions.db"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size: int = 268435456
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    group_commit: bool = False
+    group_commit_batch_size: int = 128
+    group_commit_wait_ms: float = 20.0
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    principal_cache_size: int = 10000
+    principal_cache_ttl: float = 60
+    embedding_backend: str = "sentence-transformers"
+    onnx_model_path: str = "./data/onnx_model"
+    onnx_quantized: bool = True
+    embedding_threads: int = 0
+    direct_answers: bool = True
+    direct_answers_path: str = "./data/direct_answers.json"
+    direct_answer_threshold: float = 0.9
+    direct_answer_margin: float = 0.05
+    context_token_budget: int = 1500
+    context_similarity_floor: float = 0.3
+    context_dedupe_threshold: float = 0.8
+    llm_max_in_flight: int = 16
+    llm_max_queue: int = 64
+    llm_max_retries: int = 3
+    llm_backoff_base: float = 0.5
+    llm_backoff_max: float = 8.0
+    llm_breaker_threshold: int = 5
+    llm_breaker_reset: float = 30.0
+    llm_fallback_model: str = "gemini-2.5-flash"
+    llm_hedge_after: float = 8.0
+    request_timeout: float = 30.0
+    embed_timeout: float = 2.0
+    retrieve_timeout: float = 5.0
+    generate_timeout: float = 25.0
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    log_debug_sample_rate: float = 0.1
 
 @lru_cache()
 def get_settings():
@@ -33,6 +100,102 @@ def get_settings():
     pinecone_cloud = os.getenv("PINECONE_CLOUD") or "aws"
     pinecone_region = os.getenv("PINECONE_REGION") or "us-east-1"
     gemini_model = os.getenv("GEMINI_MODEL") or "gemini-2.5-pro"
+    blocking_pool_size = int(os.getenv("BLOCKING_POOL_SIZE") or 32)
+    # Build and warm up the chatbot at startup instead of on the first request
+    eager_warmup = (os.getenv("EAGER_WARMUP") or "true").lower() == "true"
+    # "pinecone" or "local" (in-process numpy index)
+    vector_backend = os.getenv("VECTOR_BACKEND") or "pinecone"
+    local_index_path = os.getenv("LOCAL_INDEX_PATH") or "./data/vector_index"
+    # Query caches in the vector store. A size of 0 turns a cache off
+    embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE") or 1024)
+    embedding_cache_ttl = float(os.getenv("EMBEDDING_CACHE_TTL") or 3600)
+    result_cache_size = int(os.getenv("RESULT_CACHE_SIZE") or 0)
+    result_cache_ttl = float(os.getenv("RESULT_CACHE_TTL") or 300)
+    # Semantic answer cache in front of Gemini
+    answer_cache_size = int(os.getenv("ANSWER_CACHE_SIZE") or 512)
+    answer_cache_ttl = float(os.getenv("ANSWER_CACHE_TTL") or 3600)
+    answer_cache_threshold = float(os.getenv("ANSWER_CACHE_THRESHOLD") or 0.95)
+    # Micro-batching of concurrent query embeddings
+    embedding_batching = (os.getenv("EMBEDDING_BATCHING") or "true").lower() == "true"
+    embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE") or 32)
+    embedding_batch_wait_ms = float(os.getenv("EMBEDDING_BATCH_WAIT_MS") or 2.0)
+    # Bulk ingestion
+    ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE") or 256)
+    ingest_upsert_batch_size = int(os.getenv("INGEST_UPSERT_BATCH_SIZE") or 100)
+    ingest_workers = int(os.getenv("INGEST_WORKERS") or 4)
+    ingest_max_retries = int(os.getenv("INGEST_MAX_RETRIES") or 3)
+    # Tracks what's in the index for incremental syncs
+    kb_manifest_path = os.getenv("KB_MANIFEST_PATH") or "./data/kb_manifest.json"
+    # Per-session conversation memory sent with each prompt
+    memory_token_budget = int(os.getenv("MEMORY_TOKEN_BUDGET") or 1000)
+    memory_max_messages = int(os.getenv("MEMORY_MAX_MESSAGES") or 20)
+    summary_token_budget = int(os.getenv("SUMMARY_TOKEN_BUDGET") or 300)
+    # Only summarize once this many messages have fallen out of the window
+    memory_compact_batch = int(os.getenv("MEMORY_COMPACT_BATCH") or 10)
+    # Chat database. SQLite by default, or e.g. postgresql+psycopg2://...
+    database_url = os.getenv("DATABASE_URL") or "sqlite:///./chat_sessions.db"
+    sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS") or 5000)
+    sqlite_cache_size_kb = int(os.getenv("SQLITE_CACHE_SIZE_KB") or 65536)
+    sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE") or 268435456)
+    # Connection pool for server databases, per worker process
+    db_pool_size = int(os.getenv("DB_POOL_SIZE") or 5)
+    db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW") or 10)
+    db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT") or 30)
+    db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE") or 1800)
+    # Group-commit chat turns from a background writer
+    group_commit = (os.getenv("GROUP_COMMIT") or "false").lower() == "true"
+    group_commit_batch_size = int(os.getenv("GROUP_COMMIT_BATCH_SIZE") or 128)
+    group_commit_wait_ms = float(os.getenv("GROUP_COMMIT_WAIT_MS") or 20.0)
+    # Password hashing cost, and how many hashes can run at once per worker
+    bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS") or 12)
+    password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS") or 2)
+    # Authenticated users, cached by id to skip a db read per request
+    principal_cache_size = int(os.getenv("PRINCIPAL_CACHE_SIZE") or 10000)
+    principal_cache_ttl = float(os.getenv("PRINCIPAL_CACHE_TTL") or 60)
+    # "sentence-transformers" (PyTorch) or "onnx" (ONNX Runtime export)
+    embedding_backend = os.getenv("EMBEDDING_BACKEND") or "sentence-transformers"
+    onnx_model_path = os.getenv("ONNX_MODEL_PATH") or "./data/onnx_model"
+    onnx_quantized = (os.getenv("ONNX_QUANTIZED") or "true").lower() == "true"
+    # Threads per embedding call, 0 leaves it to the runtime
+    embedding_threads = int(os.getenv("EMBEDDING_THREADS") or 0)
+    # Ready-made answers for FAQ questions asked near-verbatim
+    direct_answers = (os.getenv("DIRECT_ANSWERS") or "true").lower() == "true"
+    direct_answers_path = os.getenv("DIRECT_ANSWERS_PATH") or "./data/direct_answers.json"
+    direct_answer_threshold = float(os.getenv("DIRECT_ANSWER_THRESHOLD") or 0.9)
+    direct_answer_margin = float(os.getenv("DIRECT_ANSWER_MARGIN") or 0.05)
+    # Retrieved docs in the prompt: token budget, min similarity, and how
+    # much two docs can overlap before the lower ranked one is dropped
+    context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET") or 1500)
+    context_similarity_floor = float(os.getenv("CONTEXT_SIMILARITY_FLOOR") or 0.3)
+    context_dedupe_threshold = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD") or 0.8)
+    # Gemini call limits: concurrent calls and how many more may wait,
+    # retries of 429/5xx (backoff in seconds), and the circuit breaker
+    llm_max_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT") or 16)
+    llm_max_queue = int(os.getenv("LLM_MAX_QUEUE") or 64)
+    llm_max_retries = int(os.getenv("LLM_MAX_RETRIES") or 3)
+    llm_backoff_base = float(os.getenv("LLM_BACKOFF_BASE") or 0.5)
+    llm_backoff_max = float(os.getenv("LLM_BACKOFF_MAX") or 8.0)
+    llm_breaker_threshold = int(os.getenv("LLM_BREAKER_THRESHOLD") or 5)
+    llm_breaker_reset = float(os.getenv("LLM_BREAKER_RESET") or 30.0)
+    # Faster model hedged in when the main one runs late. Set it to
+    # "none" to turn hedging off
+    llm_fallback_model = os.getenv("LLM_FALLBACK_MODEL") or "gemini-2.5-flash"
+    if llm_fallback_model.lower() == "none":
+        llm_fallback_model = ""
+    llm_hedge_after = float(os.getenv("LLM_HEDGE_AFTER") or 8.0)
+    # Seconds a chat request may take in all, and each stage of it
+    request_timeout = float(os.getenv("REQUEST_TIMEOUT") or 30.0)
+    embed_timeout = float(os.getenv("EMBED_TIMEOUT") or 2.0)
+    retrieve_timeout = float(os.getenv("RETRIEVE_TIMEOUT") or 5.0)
+    generate_timeout = float(os.getenv("GENERATE_TIMEOUT") or 25.0)
+    # Logging: default level, per-logger overrides ("app.core.chatbot=DEBUG,..."),
+    # json or text, queue size before records get dropped, and the share of
+    # DEBUG records kept
+    log_level = os.getenv("LOG_LEVEL") or "INFO"
+    log_levels = os.getenv("LOG_LEVELS") or ""
+    log_format = (os.getenv("LOG_FORMAT") or "json").lower()
+    log_queue_size = int(os.getenv("LOG_QUEUE_SIZE") or 10000)
+    log_debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE") or 0.1)
 
     return Settings(
         gemini_api_key=gemini_key,
@@ -41,4 +204,71 @@ def get_settings():
         pinecone_cloud=pinecone_cloud,
         pinecone_region=pinecone_region,
         gemini_model=gemini_model,
+        blocking_pool_size=blocking_pool_size,
+        eager_warmup=eager_warmup,
+        vector_backend=vector_backend,
+        local_index_path=local_index_path,
+        embedding_cache_size=embedding_cache_size,
+        embedding_cache_ttl=embedding_cache_ttl,
+        result_cache_size=result_cache_size,
+        result_cache_ttl=result_cache_ttl,
+        answer_cache_size=answer_cache_size,
+        answer_cache_ttl=answer_cache_ttl,
+        answer_cache_threshold=answer_cache_threshold,
+        embedding_batching=embedding_batching,
+        embedding_batch_size=embedding_batch_size,
+        embedding_batch_wait_ms=embedding_batch_wait_ms,
+        ingest_batch_size=ingest_batch_size,
+        ingest_upsert_batch_size=ingest_upsert_batch_size,
+        ingest_workers=ingest_workers,
+        ingest_max_retries=ingest_max_retries,
+        kb_manifest_path=kb_manifest_path,
+        memory_token_budget=memory_token_budget,
+        memory_max_messages=memory_max_messages,
+        summary_token_budget=summary_token_budget,
+        memory_compact_batch=memory_compact_batch,
+        database_url=database_url,
+        sqlite_busy_timeout_ms=sqlite_busy_timeout_ms,
+        sqlite_cache_size_kb=sqlite_cache_size_kb,
+        sqlite_mmap_size=sqlite_mmap_size,
+        db_pool_size=db_pool_size,
+        db_max_overflow=db_max_overflow,
+        db_pool_timeout=db_pool_timeout,
+        db_pool_recycle=db_pool_recycle,
+        group_commit=group_commit,
+        group_commit_batch_size=group_commit_batch_size,
+        group_commit_wait_ms=group_commit_wait_ms,
+        bcrypt_rounds=bcrypt_rounds,
+        password_hash_workers=password_hash_workers,
+        principal_cache_size=principal_cache_size,
+        principal_cache_ttl=principal_cache_ttl,
+        embedding_backend=embedding_backend,
+        onnx_model_path=onnx_model_path,
+        onnx_quantized=onnx_quantized,
+        embedding_threads=embedding_threads,
+        direct_answers=direct_answers,
+        direct_answers_path=direct_answers_path,
+        direct_answer_threshold=direct_answer_threshold,
+        direct_answer_margin=direct_answer_margin,
+        context_token_budget=context_token_budget,
+        context_similarity_floor=context_similarity_floor,
+        context_dedupe_threshold=context_dedupe_threshold,
+        llm_max_in_flight=llm_max_in_flight,
+        llm_max_queue=llm_max_queue,
+        llm_max_retries=llm_max_retries,
+        llm_backoff_base=llm_backoff_base,
+        llm_backoff_max=llm_backoff_max,
+        llm_breaker_threshold=llm_breaker_threshold,
+        llm_breaker_reset=llm_breaker_reset,
+        llm_fallback_model=llm_fallback_model,
+        llm_hedge_after=llm_hedge_after,
+        request_timeout=request_timeout,
+        embed_timeout=embed_timeout,
+        retrieve_timeout=retrieve_timeout,
+        generate_timeout=generate_timeout,
+        log_level=log_level,
+        log_levels=log_levels,
+        log_format=log_format,
+        log_queue_size=log_queue_size,
+        log_debug_sample_rate=log_debug_sample_rate,
     ) 
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""Token counting helpers."""
+
+# Rough average for English text with Gemini/SentencePiece style tokenizers.
+# Good enough for budgeting, and free compared to a count_tokens API call
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a piece of text will use."""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, on a word boundary if possible."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "..."
@@ -0,0 +1,277 @@
+"""Storage backends for the vector store."""
+from abc import ABC, abstractmethod
+from pinecone import Pinecone, ServerlessSpec
+from typing import List, Dict, Any, Optional
+import numpy as np
+import threading
+import json
+import os
+import shutil
+import time
+import uuid
+import logging
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+class VectorBackend(ABC):
+    """
+    Interface for where the embeddings live.
+
+    The VectorStore does the embedding, backends only store vectors and
+    answer nearest-neighbour queries. Query results are dicts with:
+    - id: the doc id
+    - score: cosine similarity to the query
+    - metadata: the stored metadata (including the doc text)
+    """
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        """Insert or replace vectors by id."""
+
+    @abstractmethod
+    def query(self, embedding: np.ndarray, top_k: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Return the top_k most similar vectors, best first. Remote backends
+        give up after timeout seconds.
+        """
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Delete vectors by id. Unknown ids are ignored."""
+
+    def flush(self):
+        """Make pending writes durable and visible. No-op by default."""
+
+class PineconeBackend(VectorBackend):
+    """Backend for a Pinecone serverless index."""
+
+    def __init__(self, settings: Settings, dimension: int):
+        self.pc = Pinecone(api_key=settings.pinecone_api_key)
+
+        # Get or create the index
+        indexes = self.pc.list_indexes()
+        if settings.pinecone_index not in [idx.name for idx in indexes]:
+            logger.info("Creating index: %s", settings.pinecone_index)
+            self.pc.create_index(
+                name=settings.pinecone_index,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud=settings.pinecone_cloud,
+                    region=settings.pinecone_region
+                )
+            )
+
+        self.index = self.pc.Index(settings.pinecone_index)
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        vectors = [
+            {"id": doc_id, "values": embedding.tolist(), "metadata": metadata}
+            for doc_id, embedding, metadata in zip(ids, embeddings, metadatas)
+        ]
+        self.index.upsert(vectors=vectors)
+
+    def delete(self, ids: List[str]):
+        # Pinecone caps ids per delete request
+        for i in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[i:i + 1000])
+
+    def query(self, embedding: np.ndarray, top_k: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        results = self.index.query(
+            vector=embedding.tolist(),
+            top_k=top_k,
+            include_metadata=True,
+            timeout=timeout
+        )
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata}
+            for match in results.matches
+        ]
+
+class NumpyBackend(VectorBackend):
+    """
+    In-process exact search over a local index.
+
+    Embeddings are L2-normalized and kept in one contiguous float32 matrix,
+    memory-mapped from disk, so a query is a single matrix-vector product
+    plus an argpartition for the top k. Good for small/medium corpora
+    where a network round trip costs more than the search itself.
+
+    Upserts and deletes are buffered and only written (and become visible)
+    on flush, so a bulk load rewrites the index once instead of per batch.
+
+    Each flush writes a new version directory and then swaps the CURRENT
+    pointer file to it, so the matrix and documents always change
+    together. Readers notice the swap and re-map, which is how a sync run
+    by a script reaches a running server without a restart.
+    """
+
+    MATRIX_FILE = "embeddings.npy"
+    DOCS_FILE = "documents.json"
+    POINTER_FILE = "CURRENT"
+    VERSION_PREFIX = "v-"
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._write_lock = threading.Lock()
+        # id -> (embedding, metadata), or None for a delete
+        self._pending: Dict[str, Optional[tuple]] = {}
+        # Identifies the pointer file we last loaded, None if there wasn't one
+        self._version_key: Optional[tuple] = None
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def _pointer_key(self) -> Optional[tuple]:
+        """Identity of the pointer file, changes on every swap."""
+        try:
+            stat = os.stat(os.path.join(self.path, self.POINTER_FILE))
+        except FileNotFoundError:
+            return None
+        # os.replace gives it a new inode, so this changes even within
+        # the mtime resolution
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _current_dir(self) -> str:
+        """Directory of the current version (the index root for old layouts)."""
+        try:
+            with open(os.path.join(self.path, self.POINTER_FILE), "r") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return self.path
+        return os.path.join(self.path, version)
+
+    def _load(self):
+        """Load (memory-map) the current version of the index from disk."""
+        # Taken before reading the pointer, so a swap in between just
+        # means one more reload later
+        key = self._pointer_key()
+        directory = self._current_dir()
+        matrix_path = os.path.join(directory, self.MATRIX_FILE)
+        docs_path = os.path.join(directory, self.DOCS_FILE)
+
+        if os.path.exists(matrix_path) and os.path.exists(docs_path):
+            matrix = np.load(matrix_path, mmap_mode="r")
+            with open(docs_path, "r") as f:
+                docs = json.load(f)
+        else:
+            matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            docs = []
+
+        if matrix.shape[0] != len(docs):
+            raise ValueError(f"Local index at {directory} is corrupt: {matrix.shape[0]} vectors but {len(docs)} documents")
+
+        # Readers grab this tuple once, so swapping it is atomic for them
+        self._snapshot = (matrix, docs)
+        self._version_key = key
+
+    def _refresh(self):
+        """Reload the index if another process swapped in a new version."""
+        if self._pointer_key() != self._version_key:
+            self._load()
+
+    def _save(self, matrix: np.ndarray, docs: List[Dict[str, Any]]):
+        """Write a new version of the index, swap to it and re-map it."""
+        previous = os.path.basename(self._current_dir())
+        version = f"{self.VERSION_PREFIX}{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        directory = os.path.join(self.path, version)
+        os.makedirs(directory)
+
+        np.save(os.path.join(directory, self.MATRIX_FILE), np.ascontiguousarray(matrix, dtype=np.float32))
+        with open(os.path.join(directory, self.DOCS_FILE), "w") as f:
+            json.dump(docs, f)
+
+        # The one atomic step: point at the new version
+        pointer_path = os.path.join(self.path, self.POINTER_FILE)
+        with open(pointer_path + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer_path + ".tmp", pointer_path)
+        self._load()
+
+        # Keep the version we replaced, a reader elsewhere may have just
+        # read the old pointer. Anything older than that can go
+        for name in os.listdir(self.path):
+            if name.startswith(self.VERSION_PREFIX) and name not in (version, previous):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so a dot product is the cosine similarity."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._snapshot[1])
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        embeddings = self._normalize(np.atleast_2d(embeddings))
+
+        with self._write_lock:
+            for doc_id, embedding, metadata in zip(ids, embeddings, metadatas):
+                self._pending[doc_id] = (embedding, metadata)
+
+    def delete(self, ids: List[str]):
+        with self._write_lock:
+            for doc_id in ids:
+                self._pending[doc_id] = None
+
+    def flush(self):
+        with self._write_lock:
+            if not self._pending:
+                return
+
+            # Merge into the latest version, not a stale one
+            self._refresh()
+            matrix, docs = self._snapshot
+
+            # Keep the rows that aren't deleted or replaced, then append
+            # everything upserted
+            keep = [i for i, doc in enumerate(docs) if doc["id"] not in self._pending]
+            upserts = [(doc_id, entry) for doc_id, entry in self._pending.items() if entry is not None]
+
+            # One allocation for the whole new matrix
+            merged = np.empty((len(keep) + len(upserts), self.dimension), dtype=np.float32)
+            merged[:len(keep)] = matrix[keep]
+            if upserts:
+                merged[len(keep):] = np.stack([embedding for _, (embedding, _) in upserts])
+            docs = [docs[i] for i in keep] + [
+                {"id": doc_id, "metadata": metadata} for doc_id, (_, metadata) in upserts
+            ]
+
+            self._save(merged, docs)
+            self._pending = {}
+
+    def query(self, embedding: np.ndarray, top_k: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        self._refresh()
+        matrix, docs = self._snapshot
+        if len(docs) == 0 or top_k <= 0:
+            return []
+
+        query = self._normalize(embedding)
+        scores = matrix @ query
+
+        # Partial sort: only the top k get ordered
+        k = min(top_k, len(docs))
+        if k < len(docs):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(docs))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {"id": docs[i]["id"], "score": float(scores[i]), "metadata": docs[i]["metadata"]}
+            for i in top
+        ]
+
+def create_backend(settings: Settings, dimension: int) -> VectorBackend:
+    """Create the vector backend selected in settings."""
+    if settings.vector_backend == "pinecone":
+        return PineconeBackend(settings, dimension)
+    if settings.vector_backend == "local":
+        return NumpyBackend(settings.local_index_path, dimension)
+    raise ValueError(f"Unknown vector backend: {settings.vector_backend}")
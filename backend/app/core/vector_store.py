@@ -1,110 +1,267 @@
-"""Pinecone vector store operations."""
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+"""Vector store operations."""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
 import hashlib
+import random
+import time
+import numpy as np
 import json
+import logging
 
 from .settings import get_settings
+from .vector_backends import VectorBackend, create_backend
+from .cache import TTLCache
+from .embedding_batcher import EmbeddingBatcher
+from .embedders import Embedder, create_embedder
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to size items from any iterable."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def document_id(text: str, metadata: Dict[str, Any]) -> str:
+    """
+    Deterministic id for a doc: a SHA-256 hash of its text and metadata,
+    so an edited doc gets a new id.
+    """
+    content = json.dumps({"text": text, "metadata": metadata}, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
 
 class VectorStore:
-    """Vector store for embeddings using pinecone."""
+    """Vector store for embeddings, backed by pinecone or a local index."""
+    
+    # all-MiniLM-L6-v2's dimension
+    DIMENSION = 384
     
-    def __init__(self):
-        """Initialize the vector store."""
+    def __init__(self, embedder: Optional[Embedder] = None, backend: Optional[VectorBackend] = None):
+        """
+        Initialize the vector store. The embedder and backend come from
+        settings unless given (the benchmarks pass in stand-ins).
+        """
         settings = get_settings()
-        # Init pinecone
-        self.pc = Pinecone(api_key=settings.pinecone_api_key)
-        
-        # Init embedding model
-        print("Loading embedding model...")
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        
-        # Get or create the index
-        indexes = self.pc.list_indexes()
-        if settings.pinecone_index not in [idx.name for idx in indexes]:
-            print(f"Creating index: {settings.pinecone_index}")
-            self.pc.create_index(
-                name=settings.pinecone_index,
-                dimension=384,  # all-MiniLM-L6-v2's dimension
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud=settings.pinecone_cloud,
-                    region=settings.pinecone_region
-                )
+        
+        # Init embedding model (PyTorch or ONNX Runtime)
+        if embedder is None:
+            logger.info("Loading embedding model (%s)...", settings.embedding_backend)
+            embedder = create_embedder(settings)
+        self.embedder = embedder
+        
+        # Init the storage backend (pinecone or local)
+        if backend is None:
+            logger.info("Using vector backend: %s", settings.vector_backend)
+            backend = create_backend(settings, self.DIMENSION)
+        self.backend = backend
+        
+        # Query embeddings are cached, popular questions repeat all day.
+        # Final search results can be cached too (off unless sized), those
+        # get dropped whenever we change the index content.
+        self._embedding_cache = TTLCache(settings.embedding_cache_size, settings.embedding_cache_ttl)
+        self._result_cache = TTLCache(settings.result_cache_size, settings.result_cache_ttl)
+        
+        # Concurrent queries get embedded together in micro-batches
+        self._batcher = None
+        if settings.embedding_batching:
+            self._batcher = EmbeddingBatcher(
+                self.encode_batch,
+                max_batch_size=settings.embedding_batch_size,
+                max_wait_ms=settings.embedding_batch_wait_ms
             )
         
-        self.index = self.pc.Index(settings.pinecone_index)
+        # Callbacks to run when the index content changes
+        self._change_listeners: List[Callable[[], None]] = []
+    
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        """Normalize query text for use as a cache key."""
+        return " ".join(text.lower().split())
     
-    def _get_embedding(self, text: str) -> List[float]:
+    def _get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for a piece of text."""
-        return self.embedding_model.encode(text).tolist()
+        return self.encode_batch([text])[0]
+    
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of texts in one call."""
+        return np.asarray(self.embedder.encode(texts), dtype=np.float32)
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Get the embedding for a search query, using the cache."""
+        key = self._normalize_query(query)
+        embedding = self._embedding_cache.get(key)
+        if embedding is None:
+            with span("embed"):
+                if self._batcher is not None:
+                    embedding = self._batcher.encode(query)
+                else:
+                    embedding = self._get_embedding(query)
+            # Shared between callers, so don't let anyone modify it
+            embedding.setflags(write=False)
+            self._embedding_cache.set(key, embedding)
+        return embedding
+    
+    def add_change_listener(self, callback: Callable[[], None]):
+        """Register a callback to run whenever documents are added or deleted."""
+        self._change_listeners.append(callback)
     
-    def _generate_id(self, text: str, metadata: Dict[str, Any]) -> str:
-        """Generate a deterministic ID for a doc."""
-        content = json.dumps({"text": text, "metadata": metadata}, sort_keys=True)
-        return hashlib.sha256(content.encode()).hexdigest()
+    def warmup(self):
+        """Run a dummy encode and query so the first real search is fast."""
+        embedding = self.encode_batch(["warm-up query"])[0]
+        self.backend.query(embedding, 1)
     
-    def add_documents(self, documents: List[Dict[str, Any]]):
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss stats for the embedding and result caches."""
+        return {
+            "embedding": self._embedding_cache.stats(),
+            "results": self._result_cache.stats(),
+        }
+    
+    def embedding_queue_depth(self) -> int:
+        """Queries waiting for the embedding batcher (0 without batching)."""
+        return self._batcher.queue_depth() if self._batcher is not None else 0
+    
+    def _upsert_with_retry(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]], retries: int):
+        """Upsert one batch, retrying with exponential backoff on failure."""
+        for attempt in range(retries + 1):
+            try:
+                self.backend.upsert(ids, embeddings, metadatas)
+                return
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = 0.5 * (2 ** attempt) + random.uniform(0, 0.1)
+                logger.warning("Upsert failed (%s: %s), retrying in %.1fs...", type(e).__name__, e, delay)
+                time.sleep(delay)
+    
+    def add_documents(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         Add documents to the vector store.
         
-        Documents should be a list of dicts, each with:
+        Documents can be any iterable (a generator works, so the whole corpus
+        never has to sit in memory), each doc a dict with:
         - text: the document text
         - metadata: other doc metadata (optional)
+        
+        Docs are embedded batch_size at a time and upserted in parallel
+        with retries. progress, if given, is called after every batch with
+        the running stats. Returns the final stats.
         """
-        vectors = []
+        settings = get_settings()
+        batch_size = batch_size or settings.ingest_batch_size
+        upsert_batch_size = settings.ingest_upsert_batch_size
+        max_workers = settings.ingest_workers
         
-        for doc in documents:
-            text = doc["text"]
-            metadata = doc.get("metadata", {})
-            
-            # Gen embedding
-            embedding = self._get_embedding(text)
+        start = time.perf_counter()
+        total = 0
+        
+        def stats() -> Dict[str, Any]:
+            elapsed = time.perf_counter() - start
+            return {
+                "documents": total,
+                "seconds": elapsed,
+                "docs_per_sec": total / elapsed if elapsed > 0 else 0.0
+            }
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as pool:
+            pending = set()
             
-            # Gen id
-            doc_id = self._generate_id(text, metadata)
+            def drain(limit: int):
+                """Wait until at most limit upserts are in flight."""
+                nonlocal pending
+                while len(pending) > limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()  # re-raise upsert errors
             
-            # Prep vector for pinecone
-            vector = {
-                "id": doc_id,
-                "values": embedding,
-                "metadata": {
-                    "text": text,
-                    **metadata
-                }
-            }
+            for chunk in _chunked(documents, batch_size):
+                texts = [doc["text"] for doc in chunk]
+                ids = []
+                metadatas = []
+                for doc in chunk:
+                    metadata = doc.get("metadata", {})
+                    ids.append(document_id(doc["text"], metadata))
+                    metadatas.append({
+                        "text": doc["text"],
+                        **metadata
+                    })
+                
+                # One encode call for the whole chunk
+                embeddings = self.encode_batch(texts)
+                
+                for i in range(0, len(chunk), upsert_batch_size):
+                    # Bound what's in flight so memory stays flat
+                    drain(max_workers * 2)
+                    pending.add(pool.submit(
+                        self._upsert_with_retry,
+                        ids[i:i + upsert_batch_size],
+                        embeddings[i:i + upsert_batch_size],
+                        metadatas[i:i + upsert_batch_size],
+                        settings.ingest_max_retries
+                    ))
+                
+                total += len(chunk)
+                if progress:
+                    progress(stats())
             
-            vectors.append(vector)
+            drain(0)
+        
+        self.backend.flush()
+        self._content_changed()
         
-        # Upsert in batches of 100 to be safe
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            self.index.upsert(vectors=batch)
+        return stats()
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def delete_documents(self, ids: List[str]):
+        """Delete documents from the vector store by id."""
+        if not ids:
+            return
+        self.backend.delete(list(ids))
+        self.backend.flush()
+        self._content_changed()
+    
+    def _content_changed(self):
+        """Drop cached results and tell listeners the index changed."""
+        self._result_cache.clear()
+        for callback in self._change_listeners:
+            callback()
+    
+    def search(self, query: str, top_k: int = 5, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
         """
-        Search for similar documents.
+        Search for similar documents, giving up on the backend query after
+        timeout seconds.
         Returns a list of documents with their similarity scores
         """
+        cache_key = (self._normalize_query(query), top_k)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return [{**doc, "metadata": dict(doc["metadata"])} for doc in cached]
+        
         # Get the query embedding
-        query_embedding = self._get_embedding(query)
+        query_embedding = self.embed_query(query)
         
-        # Search pinecone
-        results = self.index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True
-        )
+        # Search the backend
+        with span("vector_query"):
+            matches = self.backend.query(query_embedding, top_k, timeout)
         
         # Format the results
         documents = []
-        for match in results.matches:
+        for match in matches:
             documents.append({
-                "text": match.metadata["text"],
-                "metadata": {k: v for k, v in match.metadata.items() if k != "text"},
-                "similarity": match.score
+                "id": match["id"],
+                "text": match["metadata"]["text"],
+                "metadata": {k: v for k, v in match["metadata"].items() if k != "text"},
+                "similarity": match["score"]
             })
         
-        return documents 
\ No newline at end of file
+        self._result_cache.set(cache_key, documents)
+        return [{**doc, "metadata": dict(doc["metadata"])} for doc in documents]
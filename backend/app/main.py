@@ -1,20 +1,66 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import time
+import logging
+from . import state
 from .api.chat import router as chat_router
 from .api.sessions import router as sessions_router
 from .api.auth import router as auth_router
+from .api.metrics import router as metrics_router
 from .core.database import create_tables
+from .core.concurrency import run_blocking, shutdown_executor
+from .core.settings import get_settings
+from .core.metrics import ServerTimingMiddleware
+from .core.log import RequestContextMiddleware, setup_logging, shutdown_logging
+from .core.group_commit import shutdown_writer
+from .core.password_hashing import shutdown_hashing_pool, warm_hashing_pool
+
+logger = logging.getLogger(__name__)
+
+async def warm_up():
+    """Build the chatbot and warm its models so the first request is fast."""
+    settings = get_settings()
+    start = time.perf_counter()
+    try:
+        logger.info("Warming up chatbot...")
+        chatbot = await run_blocking(state.get_or_create_chatbot, settings.gemini_api_key)
+        await run_blocking(chatbot.warmup)
+        await run_blocking(warm_hashing_pool)
+        state.ready = True
+        logger.info("Warm-up done in %.1fs, ready for traffic", time.perf_counter() - start)
+    except Exception as e:
+        # Stay not-ready, requests can still build the chatbot lazily
+        state.warmup_error = f"{type(e).__name__}: {e}"
+        logger.error("Warm-up failed (%s)", state.warmup_error)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("--- Server starting up... ---")
+    # Before anything logs, so startup goes through the same pipeline
+    setup_logging(get_settings())
+    logger.info("Server starting up")
     # Init database tables
     create_tables()
-    print("Database tables created/verified")
-    # Lazy initialization of the chatbot happens in a request dependency
+    logger.info("Database tables created/verified")
+    
+    # Warm up in the background so /health and /ready answer right away
+    warmup_task = None
+    if get_settings().eager_warmup:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        # Lazy initialization of the chatbot happens in a request dependency
+        state.ready = True
     yield
-    print("--- Server shutting down... ---")
+    logger.info("Server shutting down")
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    # Commit any chat turns still queued for the group commit writer
+    shutdown_writer()
+    shutdown_hashing_pool()
+    shutdown_executor()
+    shutdown_logging()
 
 app = FastAPI(title="Ellie by Eloquent AI", lifespan=lifespan)
 
@@ -30,11 +76,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage timings in a Server-Timing header, and latency by route
+app.add_middleware(ServerTimingMiddleware)
+# Outermost, so everything logged for a request carries its id
+app.add_middleware(RequestContextMiddleware)
+
 # Include the routers
 app.include_router(chat_router, prefix="/api", tags=["chat"])
 app.include_router(sessions_router, prefix="/api", tags=["sessions"]) 
 app.include_router(auth_router, prefix="/api/auth", tags=["authentication"])
+app.include_router(metrics_router, tags=["metrics"])
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for the load balancer: 503 until warm-up is done."""
+    if state.ready:
+        return {"status": "ready"}
+    
+    body = {"status": "warming_up"}
+    if state.warmup_error:
+        body = {"status": "warmup_failed", "error": state.warmup_error}
+    return JSONResponse(status_code=503, content=body)
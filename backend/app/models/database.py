@@ -1,5 +1,5 @@
 """Database models for user management and chat persistence"""
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, ForeignKey, Index, desc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -30,6 +30,21 @@ class Session(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_activity = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    # Denormalized stats, kept up to date by SessionService.save_message
+    # so listing sessions never has to touch chat_messages
+    message_count = Column(Integer, default=0, server_default="0")
+    preview = Column(String, nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Rolling summary of the older turns, and the last message id it covers
+    summary = Column(Text, nullable=True)
+    summary_through_id = Column(Integer, nullable=True)
+    
+    # Matches the sidebar query: one user's sessions, most recent first
+    __table_args__ = (
+        Index("ix_sessions_user_activity", "user_id", desc("last_activity"), desc("id")),
+    )
+    
     # Relations
     user = relationship("User", back_populates="sessions")
     messages = relationship("ChatMessage", back_populates="session", order_by="ChatMessage.created_at")
@@ -44,5 +59,12 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # History pages walk a session's messages by id, the relationship
+    # loads them by created_at
+    __table_args__ = (
+        Index("ix_chat_messages_session_id", "session_id", "id"),
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+    )
+    
     # Relationships
     session = relationship("Session", back_populates="messages") 
\ No newline at end of file
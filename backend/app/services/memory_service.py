@@ -0,0 +1,138 @@
+"""Service for per-session conversation memory."""
+from sqlalchemy.orm import Session
+from ..models.database import Session as SessionModel, ChatMessage
+from ..core.tokens import estimate_tokens, truncate_to_tokens
+from typing import Optional, List, Dict, Any
+from dataclasses import dataclass, field
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ConversationContext:
+    """What the chatbot gets to see of a conversation."""
+    summary: Optional[str] = None
+    turns: List[Dict[str, str]] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+class MemoryService:
+    """
+    Loads bounded conversation context for a session.
+    
+    The most recent turns that fit in the token budget are sent verbatim,
+    anything older gets folded into a rolling summary stored on the session.
+    That keeps prompt size (and what we load from the db) constant however
+    long a conversation gets.
+    """
+    
+    def __init__(
+        self,
+        db: Session,
+        token_budget: int,
+        max_messages: int,
+        summary_token_budget: int,
+        compact_batch: int = 1
+    ):
+        self.db = db
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summary_token_budget = summary_token_budget
+        self.compact_batch = max(1, compact_batch)
+    
+    def _window(self, messages: List[ChatMessage]) -> int:
+        """
+        Given messages oldest first, return the index where the recent
+        window starts (everything before it is overflow).
+        """
+        used = 0
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            cost = estimate_tokens(messages[i].content)
+            if used + cost > self.token_budget or len(messages) - i > self.max_messages:
+                break
+            used += cost
+            start = i
+        return start
+    
+    def _unsummarized(self, session: SessionModel, limit: int) -> List[ChatMessage]:
+        """Newest messages not covered by the summary yet, oldest first."""
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session.id)
+        if session.summary_through_id is not None:
+            query = query.filter(ChatMessage.id > session.summary_through_id)
+        messages = query.order_by(ChatMessage.id.desc()).limit(limit).all()
+        return list(reversed(messages))
+    
+    def load(self, session_id: str) -> ConversationContext:
+        """Get the summary plus the recent turns that fit the budget."""
+        session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
+        if not session:
+            return ConversationContext()
+        
+        messages = self._unsummarized(session, self.max_messages)
+        recent = messages[self._window(messages):]
+        return ConversationContext(
+            summary=session.summary,
+            turns=[{"role": msg.role, "content": msg.content} for msg in recent]
+        )
+    
+    def get_overflow(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the oldest turns that fell out of the recent window and should
+        be folded into the summary, or None until at least compact_batch
+        of them have piled up (so a long chat doesn't cost a summary call
+        every turn).
+        
+        The turns always start right after what the summary covers and
+        are contiguous, so a backlog bigger than one call's worth gets
+        folded over the next compactions rather than skipped.
+        """
+        session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
+        if not session:
+            return None
+        
+        # Where the recent window starts, everything before it is overflow
+        messages = self._unsummarized(session, self.max_messages)
+        if not messages:
+            return None
+        start = self._window(messages)
+        boundary = messages[start].id if start < len(messages) else messages[-1].id + 1
+        
+        query = self.db.query(ChatMessage).filter(
+            ChatMessage.session_id == session.id,
+            ChatMessage.id < boundary
+        )
+        if session.summary_through_id is not None:
+            query = query.filter(ChatMessage.id > session.summary_through_id)
+        overflow = (
+            query.order_by(ChatMessage.id.asc())
+            .limit(max(self.max_messages, self.compact_batch))
+            .all()
+        )
+        if len(overflow) < self.compact_batch:
+            return None
+        
+        return {
+            "summary": session.summary,
+            "turns": [{"role": msg.role, "content": msg.content} for msg in overflow],
+            "through_id": overflow[-1].id
+        }
+    
+    def save_summary(self, session_id: str, summary: str, through_id: int) -> bool:
+        """Store a new rolling summary covering messages up to through_id."""
+        try:
+            session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
+            if not session:
+                return False
+            # A newer summary already got saved, don't go backwards
+            if session.summary_through_id is not None and session.summary_through_id >= through_id:
+                return False
+            session.summary = truncate_to_tokens(summary, self.summary_token_budget)
+            session.summary_through_id = through_id
+            self.db.commit()
+            return True
+        except Exception:
+            logger.exception("Error saving summary")
+            self.db.rollback()
+            return False
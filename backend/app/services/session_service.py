@@ -1,9 +1,20 @@
 """Service for session management."""
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.orm import Session
 from ..models.database import Session as SessionModel, ChatMessage, User
 import uuid
+import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from ..core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_LENGTH = 50
+
+def make_preview(content: str) -> str:
+    """Sidebar preview text for a session's first user message."""
+    return content[:PREVIEW_LENGTH] + ("..." if len(content) > PREVIEW_LENGTH else "")
 
 class SessionService:
     """Handles user sessions and chat history"""
@@ -11,6 +22,7 @@ class SessionService:
     def __init__(self, db: Session):
         self.db = db
     
+    @timed("db.create_anonymous_session")
     def create_anonymous_session(self) -> str:
         """Make a new anonymous session."""
         session_id = str(uuid.uuid4())
@@ -23,6 +35,7 @@ class SessionService:
         self.db.commit()
         return session_id
     
+    @timed("db.create_user_session")
     def create_user_session(self, user_id: int) -> str:
         """Make a new session and link it to a user"""
         session_id = str(uuid.uuid4())
@@ -35,23 +48,31 @@ class SessionService:
         self.db.commit()
         return session_id
     
-    def get_or_create_session(self, session_id: Optional[str] = None) -> str:
-        """Get an existing session or create a new one"""
+    @timed("db.get_or_create_session")
+    def get_or_create_session(self, session_id: Optional[str] = None, touch: bool = True) -> str:
+        """
+        Get an existing session or create a new one.
+        Pass touch=False when the caller is about to write to the session
+        anyway (saving a message bumps last_activity), to skip a commit.
+        """
         if session_id:
             session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
             if session:
-                # Update last activity timestamp
-                session.last_activity = datetime.utcnow()
-                self.db.commit()
+                if touch:
+                    # Update last activity timestamp
+                    session.last_activity = datetime.utcnow()
+                    self.db.commit()
                 return session_id
         
         # No session found, so create a new anonymous one
         return self.create_anonymous_session()
     
+    @timed("db.get_session_model")
     def get_session_model(self, session_id: str) -> Optional[SessionModel]:
         """Gets the raw session model object"""
         return self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
     
+    @timed("db.delete_session")
     def delete_session(self, session_id: str) -> bool:
         """Deletes a session and all its msgs."""
         try:
@@ -65,46 +86,165 @@ class SessionService:
                 self.db.commit()
                 return True
             return False
-        except Exception as e:
-            print(f"Error deleting session: {e}")
+        except Exception:
+            logger.exception("Error deleting session")
             self.db.rollback()
             return False
     
-    def save_message(self, session_id: str, role: str, content: str) -> bool:
-        """Saves a chat message to the db"""
-        try:
-            message = ChatMessage(
-                session_id=session_id,
-                role=role,
-                content=content
+    def _add_message(self, session_id: str, role: str, content: str) -> ChatMessage:
+        """Add a message and bump the session's stats, without committing."""
+        message = ChatMessage(
+            session_id=session_id,
+            role=role,
+            content=content
+        )
+        self.db.add(message)
+        
+        # Keep the session's stats in step, in the same transaction.
+        # An atomic UPDATE so concurrent saves can't lose a count
+        stats = {
+            SessionModel.message_count: func.coalesce(SessionModel.message_count, 0) + 1,
+            SessionModel.last_message_at: func.now(),
+            SessionModel.last_activity: func.now(),
+        }
+        if role == "user":
+            # Only the first user message becomes the preview
+            stats[SessionModel.preview] = case(
+                (SessionModel.preview.is_(None), make_preview(content)),
+                else_=SessionModel.preview
             )
-            self.db.add(message)
+        self.db.query(SessionModel).filter(SessionModel.id == session_id).update(
+            stats, synchronize_session=False
+        )
+        return message
+    
+    @timed("db.save_message")
+    def save_message(self, session_id: str, role: str, content: str) -> Optional[int]:
+        """Saves a chat message to the db. Returns its id, or None on failure"""
+        try:
+            message = self._add_message(session_id, role, content)
+            # Flush first so we get the id without a refresh query after commit
+            self.db.flush()
+            message_id = message.id
             self.db.commit()
-            return True
-        except Exception as e:
-            print(f"Error saving message: {e}")
+            return message_id
+        except Exception:
+            logger.exception("Error saving message")
             self.db.rollback()
-            return False
+            return None
     
-    def get_chat_history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get the chat history for a session."""
-        messages = (
-            self.db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session_id)
-            .order_by(ChatMessage.created_at)
-            .limit(limit)
-            .all()
-        )
+    @timed("db.add_turn")
+    def add_turn(
+        self,
+        session_id: str,
+        user_content: str,
+        assistant_content: Optional[str] = None
+    ) -> Tuple[int, Optional[int]]:
+        """
+        Add a user message and its reply (if there is one) without
+        committing. Returns the ids of both. Raises on failure, so the
+        caller decides what to roll back.
+        """
+        user_message = self._add_message(session_id, "user", user_content)
+        assistant_message = None
+        if assistant_content is not None:
+            assistant_message = self._add_message(session_id, "assistant", assistant_content)
+        self.db.flush()
+        return user_message.id, assistant_message.id if assistant_message else None
+    
+    @timed("db.record_turn")
+    def record_turn(
+        self,
+        session_id: str,
+        user_content: str,
+        assistant_content: Optional[str] = None
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Save a whole chat turn in one transaction, so it costs one commit
+        instead of one per message. Returns the message ids, or Nones on failure
+        """
+        try:
+            ids = self.add_turn(session_id, user_content, assistant_content)
+            self.db.commit()
+            return ids
+        except Exception:
+            logger.exception("Error saving turn")
+            self.db.rollback()
+            return None, None
+    
+    @timed("db.get_message")
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single message by id."""
+        message = self.db.query(ChatMessage).filter(ChatMessage.id == message_id).first()
+        return self._message_to_dict(message) if message else None
+    
+    @staticmethod
+    def _message_to_dict(msg: ChatMessage) -> Dict[str, Any]:
+        return {
+            "id": msg.id,
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.created_at.isoformat()
+        }
+    
+    @timed("db.get_chat_history_page")
+    def get_chat_history_page(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before: Optional[int] = None,
+        after: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a page of chat history using keyset pagination on message id.
         
-        return [
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.created_at.isoformat()
-            }
-            for msg in messages
-        ]
+        - no cursor: the newest `limit` messages
+        - before: the `limit` messages just older than that id
+        - after: the `limit` messages just newer than that id
+        
+        Messages always come back oldest first. has_more says whether there's
+        more in the direction we paged, and next_before/next_after are the
+        cursors for the older/newer neighbouring pages.
+        """
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        
+        # Fetch one extra row to know if there's another page
+        if after is not None:
+            rows = (
+                query.filter(ChatMessage.id > after)
+                .order_by(ChatMessage.id.asc())
+                .limit(limit + 1)
+                .all()
+            )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            if before is not None:
+                query = query.filter(ChatMessage.id < before)
+            rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = list(reversed(rows[:limit]))
+        
+        messages = [self._message_to_dict(msg) for msg in rows]
+        return {
+            "messages": messages,
+            "has_more": has_more,
+            "next_before": messages[0]["id"] if messages else before,
+            "next_after": messages[-1]["id"] if messages else after
+        }
+    
+    @timed("db.get_chat_history")
+    def get_chat_history(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before: Optional[int] = None,
+        after: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the chat history for a session (newest `limit` messages by default)."""
+        return self.get_chat_history_page(session_id, limit, before, after)["messages"]
     
+    @timed("db.get_session_info")
     def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get a session's info"""
         session = self.db.query(SessionModel).filter(SessionModel.id == session_id).first()
@@ -116,45 +256,70 @@ class SessionService:
             "is_anonymous": session.is_anonymous,
             "created_at": session.created_at.isoformat(),
             "last_activity": session.last_activity.isoformat(),
-            "message_count": len(session.messages)
+            "message_count": session.message_count or 0
         }
     
-    def get_user_sessions_with_preview(self, user_id: int) -> List[Dict[str, Any]]:
+    @timed("db.get_user_sessions_with_preview")
+    def get_user_sessions_with_preview(
+        self,
+        user_id: int,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Get user sessions with a preview of the chat
-        for the sidebar
+        for the sidebar, newest activity first.
+        
+        One query, reading only the sessions table (the stats are
+        denormalized onto it). Keyset paginated over (last_activity, id):
+        the cursor is the last session id of the previous page, pass
+        next_cursor back to get the next page.
         """
+        query = self.db.query(SessionModel).filter(SessionModel.user_id == user_id)
+        
+        if cursor:
+            # Compare against the cursor row's stored value in the db rather
+            # than a round-tripped timestamp, so formats/precision always match
+            anchor = (
+                self.db.query(SessionModel.last_activity)
+                .filter(SessionModel.id == cursor, SessionModel.user_id == user_id)
+                .scalar_subquery()
+            )
+            query = query.filter(or_(
+                SessionModel.last_activity < anchor,
+                and_(SessionModel.last_activity == anchor, SessionModel.id < cursor)
+            ))
+        
+        # One extra row tells us if there's another page
         sessions = (
-            self.db.query(SessionModel)
-            .filter(SessionModel.user_id == user_id)
-            .order_by(SessionModel.last_activity.desc())
+            query.order_by(SessionModel.last_activity.desc(), SessionModel.id.desc())
+            .limit(limit + 1)
             .all()
         )
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
         
-        result = []
-        for session in sessions:
-            # Get the first user message as a preview
-            first_message = (
-                self.db.query(ChatMessage)
-                .filter(ChatMessage.session_id == session.id, ChatMessage.role == "user")
-                .order_by(ChatMessage.created_at.asc())
-                .first()
-            )
-            
-            preview_text = "New Chat"
-            if first_message:
-                preview_text = first_message.content[:50] + ("..." if len(first_message.content) > 50 else "")
-            
-            result.append({
+        result = [
+            {
                 "session_id": session.id,
-                "preview": preview_text,
-                "message_count": len(session.messages),
+                "preview": session.preview or "New Chat",
+                "message_count": session.message_count or 0,
                 "last_activity": session.last_activity.isoformat(),
+                "last_message_at": session.last_message_at.isoformat() if session.last_message_at else None,
                 "created_at": session.created_at.isoformat()
-            })
+            }
+            for session in sessions
+        ]
         
-        return result
+        next_cursor = sessions[-1].id if has_more and sessions else None
+        
+        return {
+            "sessions": result,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }
     
+    @timed("db.link_session_to_user")
     def link_session_to_user(self, session_id: str, user_Id: int) -> bool:
         """Link an anon session to a user account."""
         try:
@@ -165,7 +330,7 @@ class SessionService:
                 self.db.commit()
                 return True
             return False
-        except Exception as e:
-            print(f"Error linking session to user: {e}")
+        except Exception:
+            logger.exception("Error linking session to user")
             self.db.rollback()
             return False 
\ No newline at end of file
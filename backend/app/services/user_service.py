@@ -1,10 +1,83 @@
 """User management stuff."""
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
 from ..models.database import User, Session as SessionModel
-from ..core.auth import hash_password, verify_password, create_access_token
+from ..core.auth import create_access_token
+from ..core.cache import TTLCache
+from ..core.concurrency import run_blocking
+from ..core.password_hashing import ahash_password, averify_password
+from ..core.settings import get_settings
 from .session_service import SessionService
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional, Tuple
 import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Principal:
+    """What a request needs to know about its authenticated user."""
+    id: int
+    email: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+    
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, is_active=bool(user.is_active), created_at=user.created_at)
+
+# Principals by user id, so authenticated requests don't need a db read
+# just to learn who they are. Kept short-lived, and dropped as soon as a
+# user's active flag or password changes (see below)
+_principal_cache: Optional[TTLCache] = None
+
+def get_principal_cache() -> TTLCache:
+    """Get (or lazily create) the principal cache."""
+    global _principal_cache
+    if _principal_cache is None:
+        settings = get_settings()
+        _principal_cache = TTLCache(settings.principal_cache_size, settings.principal_cache_ttl)
+    return _principal_cache
+
+def cached_principal(user_id: int) -> Optional[Principal]:
+    """The cached principal for a user, if there is one."""
+    return get_principal_cache().get(user_id)
+
+def invalidate_principal(user_id: int):
+    """Forget a cached principal."""
+    get_principal_cache().pop(user_id)
+
+# Fields that a cached principal copies or that decide what it's allowed to do
+_PRINCIPAL_FIELDS = ("email", "is_active", "hashed_password")
+
+@event.listens_for(Session, "after_flush")
+def _track_principal_changes(session, flush_context):
+    """
+    Drop principals whose user was just deactivated, had its password or
+    email changed or was deleted, whichever code path did it. They're dropped
+    again after the commit, in case a request re-cached the old row in
+    between.
+    """
+    changed = set()
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(get_history(obj, field).has_changes() for field in _PRINCIPAL_FIELDS):
+            changed.add(obj.id)
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, User))
+    for user_id in changed:
+        invalidate_principal(user_id)
+    session.info.setdefault("changed_principals", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session):
+    for user_id in session.info.pop("changed_principals", ()):
+        invalidate_principal(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_principal_changes(session):
+    session.info.pop("changed_principals", None)
 
 class UserService:
     """Service for user management and auth."""
@@ -29,11 +102,17 @@ class UserService:
         """Get user by id"""
         return self.db.query(User).filter(User.id == user_id).first()
     
-    def create_user(self, email: str, password: str, session_id: Optional[str] = None) -> Tuple[User, str]:
-        """
-        Create a new user account.
-        Returns the user and an access token
-        """
+    def load_principal(self, user_id: int) -> Optional[Principal]:
+        """Read a user's principal from the db and cache it. None if there's no such user"""
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        get_principal_cache().set(user_id, principal)
+        return principal
+    
+    def _check_new_user(self, email: str, password: str):
+        """Raise a ValueError if these can't be used for a new account."""
         # Some validation
         if not self.validate_email(email):
             raise ValueError("Invalid email format")
@@ -44,10 +123,11 @@ class UserService:
         # Check if user exists
         if self.get_user_by_email(email):
             raise ValueError("User with this email already exists")
-        
+    
+    def _add_user(self, email: str, hashed_password: str, session_id: Optional[str] = None) -> Tuple[User, str]:
+        """Store a user whose password is already hashed. Returns the user and a token"""
         try:
             # Create the user
-            hashed_password = hash_password(password)
             user = User(
                 email=email,
                 hashed_password=hashed_password,
@@ -71,8 +151,18 @@ class UserService:
             self.db.rollback()
             raise ValueError(f"Failed to create user: {str(e)}")
     
-    def authenticate_user(self, email: str, password: str) -> Tuple[User, str]:
-        """Auth a user and return user and token."""
+    async def acreate_user(self, email: str, password: str, session_id: Optional[str] = None) -> Tuple[User, str]:
+        """
+        Create a new user account. Returns the user and an access token.
+        DB calls go to the blocking executor and the hashing to the hashing
+        pool, so the event loop stays free.
+        """
+        await run_blocking(self._check_new_user, email, password)
+        hashed_password = await ahash_password(password)
+        return await run_blocking(self._add_user, email, hashed_password, session_id)
+    
+    def _get_login_user(self, email: str) -> User:
+        """The active user for a login attempt, or a ValueError."""
         user = self.get_user_by_email(email)
         
         if not user:
@@ -81,10 +171,29 @@ class UserService:
         if not user.is_active:
             raise ValueError("Account is disabled")
         
-        if not verify_password(password, user.hashed_password):
+        return user
+    
+    def _update_password_hash(self, user: User, hashed_password: str):
+        """Store a rehashed password. Failing is fine, the old hash still works"""
+        try:
+            user.hashed_password = hashed_password
+            self.db.commit()
+        except Exception:
+            logger.exception("Error updating password hash")
+            self.db.rollback()
+    
+    async def aauthenticate_user(self, email: str, password: str) -> Tuple[User, str]:
+        """Auth a user and return user and token. Runs off the event loop like acreate_user."""
+        user = await run_blocking(self._get_login_user, email)
+        
+        valid, new_hash = await averify_password(password, user.hashed_password)
+        if not valid:
             raise ValueError("Invalid email or password")
         
-        # Create access token
+        # The hash uses an old cost, upgrade it while we have the password
+        if new_hash:
+            await run_blocking(self._update_password_hash, user, new_hash)
+        
         access_token = create_access_token(data={"sub": str(user.id)})
         
         return user, access_token
@@ -103,7 +212,7 @@ class UserService:
                 "is_anonymous": session.is_anonymous,
                 "created_at": session.created_at.isoformat(),
                 "last_activity": session.last_activity.isoformat(),
-                "message_count": len(session.messages)
+                "message_count": session.message_count or 0
             }
             for session in sessions
         ] 
\ No newline at end of file
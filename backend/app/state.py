@@ -1,5 +1,20 @@
 from typing import Optional
+import threading
 from .core.chatbot import Chatbot
 
 # Global chatbot instance for the app
-chatbot_instance: Optional[Chatbot] = None 
\ No newline at end of file
+chatbot_instance: Optional[Chatbot] = None
+_chatbot_lock = threading.Lock()
+
+# Readiness, flipped once the chatbot is warmed up (see main.lifespan)
+ready: bool = False
+warmup_error: Optional[str] = None
+
+def get_or_create_chatbot(api_key: str) -> Chatbot:
+    """Get the shared chatbot, creating it once even if called concurrently."""
+    global chatbot_instance
+    if chatbot_instance is None:
+        with _chatbot_lock:
+            if chatbot_instance is None:
+                chatbot_instance = Chatbot(api_key=api_key)
+    return chatbot_instance
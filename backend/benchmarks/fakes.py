@@ -0,0 +1,167 @@
+"""Local stand-ins for Gemini, Pinecone and the embedding model."""
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+
+from app.core.embedders import Embedder
+from app.core.vector_backends import VectorBackend
+
+@dataclass
+class LatencyProfile:
+    """
+    How a fake dependency behaves: a base latency plus jitter, and a share
+    of calls that fail.
+
+    Jitter is exponentially distributed with jitter_ms as its mean, so
+    there's a long tail like with the real thing rather than a flat spread.
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self) -> float:
+        """Seconds the next call takes."""
+        jitter = random.expovariate(1 / self.jitter_ms) if self.jitter_ms > 0 else 0.0
+        return (self.latency_ms + jitter) / 1000
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+class _Response:
+    """The part of a Gemini response the chatbot reads."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGeminiModel:
+    """
+    Stands in for genai.GenerativeModel. Answers after the profile's
+    latency, or fails with a 503 like an overloaded Gemini would (so
+    retries and the circuit breaker get exercised).
+
+    Streamed answers send the first chunk after the latency and the rest
+    chunk_ms apart.
+    """
+
+    ANSWER = (
+        "Thanks for reaching out. Based on our FAQ, you can do this from the app: "
+        "open Settings, pick the option you need and follow the steps on screen. "
+        "If anything looks wrong, our support team is available around the clock."
+    )
+
+    def __init__(self, profile: LatencyProfile, chunks: int = 8, chunk_ms: float = 20.0):
+        self.profile = profile
+        self.chunks = chunks
+        self.chunk_ms = chunk_ms
+        self.calls = 0
+
+    def _chunks(self) -> List[str]:
+        words = self.ANSWER.split(" ")
+        size = max(1, len(words) // self.chunks)
+        return [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+
+    def _check(self):
+        self.calls += 1
+        if self.profile.fails():
+            raise google_exceptions.ServiceUnavailable("Fake Gemini is overloaded")
+
+    async def _stream(self, delay: float) -> AsyncIterator[_Response]:
+        await asyncio.sleep(delay)
+        for i, chunk in enumerate(self._chunks()):
+            if i:
+                await asyncio.sleep(self.chunk_ms / 1000)
+            yield _Response(chunk)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self._check()
+        delay = self.profile.delay()
+        if stream:
+            return self._stream(delay)
+        await asyncio.sleep(delay)
+        return _Response(self.ANSWER)
+
+    def generate_content(self, prompt: str):
+        self._check()
+        time.sleep(self.profile.delay())
+        return _Response(self.ANSWER)
+
+class FakeEmbedder(Embedder):
+    """
+    Stands in for the sentence-transformers model: hashes words into a
+    bag-of-words vector. Texts sharing words come out similar, which is
+    enough for retrieval and the caches to behave realistically.
+    """
+
+    def __init__(self, dimension: int = 384, profile: Optional[LatencyProfile] = None):
+        self.dimension = dimension
+        self.profile = profile or LatencyProfile()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Runs in a worker thread like the real model, so a blocking sleep
+        time.sleep(self.profile.delay())
+        return np.stack([self._embed(text) for text in texts]) if texts else np.zeros((0, self.dimension), np.float32)
+
+class FakePineconeBackend(VectorBackend):
+    """
+    Stands in for Pinecone: exact in-memory search behind a simulated
+    network round trip. A query slower than its timeout sleeps for the
+    timeout and raises, like the client would.
+    """
+
+    def __init__(self, dimension: int, profile: Optional[LatencyProfile] = None):
+        self.dimension = dimension
+        self.profile = profile or LatencyProfile()
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        with self._lock:
+            rows = dict(zip(self._ids, zip(self._matrix, self._metadatas)))
+            for doc_id, embedding, metadata in zip(ids, embeddings, metadatas):
+                rows[doc_id] = (np.asarray(embedding, dtype=np.float32), metadata)
+            self._set_rows(rows)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            rows = dict(zip(self._ids, zip(self._matrix, self._metadatas)))
+            for doc_id in ids:
+                rows.pop(doc_id, None)
+            self._set_rows(rows)
+
+    def _set_rows(self, rows: Dict[str, tuple]):
+        self._ids = list(rows)
+        self._metadatas = [metadata for _, metadata in rows.values()]
+        self._matrix = np.stack([embedding for embedding, _ in rows.values()]) if rows else np.zeros((0, self.dimension), np.float32)
+
+    def query(self, embedding: np.ndarray, top_k: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        delay = self.profile.delay()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake Pinecone query timed out after {timeout:.1f}s")
+        time.sleep(delay)
+        if self.profile.fails():
+            raise ConnectionError("Fake Pinecone is unavailable")
+
+        ids, metadatas, matrix = self._ids, self._metadatas, self._matrix
+        if not ids:
+            return []
+        scores = matrix @ np.asarray(embedding, dtype=np.float32)
+        top = np.argsort(-scores)[:top_k]
+        return [{"id": ids[i], "score": float(scores[i]), "metadata": metadatas[i]} for i in top]
@@ -0,0 +1,101 @@
+"""Latency recording and the JSON benchmark report."""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+class Recorder:
+    """Latencies and failures per scenario, as the load generator sees them."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.endpoints: Dict[str, str] = {}
+
+    def record(self, scenario: str, endpoint: str, seconds: float, error: Optional[str] = None):
+        """Record one request. error is the status code (or exception name) if it failed."""
+        self.endpoints[scenario] = endpoint
+        self.latencies[scenario].append(seconds)
+        if error is not None:
+            self.errors[scenario][error] += 1
+
+def _latency_ms(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies) * 1000
+    summary = {f"p{q}": round(float(np.percentile(values, q)), 2) for q in PERCENTILES}
+    summary["mean"] = round(float(values.mean()), 2)
+    summary["max"] = round(float(values.max()), 2)
+    return summary
+
+def _summary(latencies: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    failed = sum(errors.values())
+    return {
+        "requests": len(latencies),
+        "errors": failed,
+        "error_rate": round(failed / len(latencies), 4),
+        "errors_by_kind": dict(errors),
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": _latency_ms(latencies),
+    }
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    """Per-scenario and overall RPS, error rate and latency percentiles."""
+    scenarios = {}
+    for name in sorted(recorder.latencies):
+        scenarios[name] = {"endpoint": recorder.endpoints[name], **_summary(recorder.latencies[name], recorder.errors[name], elapsed)}
+
+    everything = [seconds for latencies in recorder.latencies.values() for seconds in latencies]
+    errors: Dict[str, int] = defaultdict(int)
+    for kinds in recorder.errors.values():
+        for kind, count in kinds.items():
+            errors[kind] += count
+    return {
+        "duration_s": round(elapsed, 2),
+        "scenarios": scenarios,
+        "overall": _summary(everything, errors, elapsed) if everything else None,
+    }
+
+def _change(current: float, baseline: float) -> Optional[float]:
+    """Relative change in percent, None if there's nothing to compare with."""
+    if not baseline:
+        return None
+    return round((current - baseline) / baseline * 100, 1)
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Change in RPS and latency percentiles against a baseline report, per
+    scenario both runs have. Positive means more (so worse, for latency).
+    """
+    changes = {}
+    for name, current in report["results"]["scenarios"].items():
+        before = baseline["results"]["scenarios"].get(name)
+        if before is None:
+            continue
+        changes[name] = {"rps_pct": _change(current["rps"], before["rps"])}
+        for key in [f"p{q}" for q in PERCENTILES]:
+            changes[name][f"{key}_pct"] = _change(current["latency_ms"][key], before["latency_ms"][key])
+    return changes
+
+def format_table(report: Dict[str, Any]) -> str:
+    """The results as a plain-text table, for reading in a terminal."""
+    header = f"{'scenario':<16}{'endpoint':<34}{'reqs':>7}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    lines = [header, "-" * len(header)]
+    changes = report.get("comparison", {})
+    rows = list(report["results"]["scenarios"].items())
+    if report["results"]["overall"]:
+        rows.append(("overall", {"endpoint": "", **report["results"]["overall"]}))
+    for name, result in rows:
+        latency = result["latency_ms"]
+        lines.append(
+            f"{name:<16}{result['endpoint']:<34}{result['requests']:>7}{result['error_rate'] * 100:>7.1f}"
+            f"{result['rps']:>9.1f}{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}"
+        )
+        if name in changes:
+            change = changes[name]
+            cells = [
+                f"{value:+.1f}%" if value is not None else "n/a"
+                for value in (change["rps_pct"], change["p50_pct"], change["p95_pct"], change["p99_pct"])
+            ]
+            lines.append(f"{'  vs baseline':<64}{cells[0]:>9}{cells[1]:>9}{cells[2]:>9}{cells[3]:>9}")
+    lines.append("(latencies in ms)")
+    return "\n".join(lines)
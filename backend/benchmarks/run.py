@@ -0,0 +1,327 @@
+"""
+Offline load test. Runs the app in-process with local stand-ins for
+Gemini, Pinecone and the embedding model, drives chat, session and auth
+endpoints with concurrent clients and reports RPS and latency percentiles
+per scenario as JSON.
+
+No API keys or network needed, so runs on different commits (on the same
+machine) can be compared:
+
+    cd backend
+    python -m benchmarks.run --duration 30 --output before.json
+    # ...change things...
+    python -m benchmarks.run --duration 30 --baseline before.json --output after.json
+
+The load generator shares the process (and event loop) with the app, so
+absolute numbers are lower than a real deployment's. They're for
+comparing runs, not capacity planning. App settings come from the
+environment as usual, e.g. BCRYPT_ROUNDS=4 for cheap auth, GROUP_COMMIT=true.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from .report import Recorder, compare, format_table, summarize
+
+FAQ_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "fintech_faqs.md")
+
+# Share of requests going to each scenario
+DEFAULT_MIX = "chat=40,chat_stream=10,session_create=10,session_history=15,my_chats=5,me=12,login=6,register=2"
+
+# Chat turns before a client starts a new conversation
+TURNS_PER_SESSION = 8
+
+class Client:
+    """One simulated user: an account, a token and a current conversation."""
+
+    def __init__(self, http, questions: List[str], repeat_rate: float):
+        self.http = http
+        self.questions = questions
+        self.repeat_rate = repeat_rate
+        self.email = f"bench-{uuid.uuid4().hex[:12]}@bench.example.com"
+        self.password = "benchmark-password"
+        self.token: Optional[str] = None
+        self.session_id: Optional[str] = None
+        self.turns = 0
+
+    @property
+    def auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def setup(self):
+        """Register and start a conversation before the clock starts."""
+        response = await self.http.post("/api/auth/register", json={"email": self.email, "password": self.password})
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+        response = await self.http.post("/api/session/create", headers=self.auth)
+        response.raise_for_status()
+        self.session_id = response.json()["session_id"]
+
+    def message(self) -> str:
+        """An FAQ question, as asked or with extra words so it isn't a cache hit."""
+        question = random.choice(self.questions)
+        if random.random() < self.repeat_rate:
+            return question
+        return f"{question} This is about my account ending {random.randint(1000, 9999)}."
+
+    def _next_turn(self) -> Optional[str]:
+        # Move on to a fresh conversation now and then, the app creates it
+        self.turns += 1
+        if self.turns > TURNS_PER_SESSION:
+            self.turns = 1
+            self.session_id = None
+        return self.session_id
+
+    async def chat(self):
+        response = await self.http.post("/api/chat", json={"message": self.message(), "session_id": self._next_turn()}, headers=self.auth)
+        if response.status_code == 200:
+            self.session_id = response.json()["session_id"]
+        return response
+
+    async def chat_stream(self):
+        response = await self.http.post("/api/chat/stream", json={"message": self.message(), "session_id": self._next_turn()}, headers=self.auth)
+        if response.status_code == 200:
+            self.session_id = _stream_session_id(response.text) or self.session_id
+        return response
+
+    async def session_create(self):
+        return await self.http.post("/api/session/create", headers=self.auth)
+
+    async def session_history(self):
+        return await self.http.get(f"/api/session/{self.session_id or 'none'}/history")
+
+    async def my_chats(self):
+        return await self.http.get("/api/sessions/my-chats", headers=self.auth)
+
+    async def me(self):
+        return await self.http.get("/api/auth/me", headers=self.auth)
+
+    async def login(self):
+        return await self.http.post("/api/auth/login", json={"email": self.email, "password": self.password})
+
+    async def register(self):
+        email = f"bench-{uuid.uuid4().hex[:12]}@bench.example.com"
+        return await self.http.post("/api/auth/register", json={"email": email, "password": self.password})
+
+# Scenario name -> (endpoint label, Client method)
+SCENARIOS: Dict[str, Tuple[str, Callable[[Client], Awaitable[Any]]]] = {
+    "chat": ("POST /api/chat", Client.chat),
+    "chat_stream": ("POST /api/chat/stream", Client.chat_stream),
+    "session_create": ("POST /api/session/create", Client.session_create),
+    "session_history": ("GET /api/session/{id}/history", Client.session_history),
+    "my_chats": ("GET /api/sessions/my-chats", Client.my_chats),
+    "me": ("GET /api/auth/me", Client.me),
+    "login": ("POST /api/auth/login", Client.login),
+    "register": ("POST /api/auth/register", Client.register),
+}
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "chat=40,me=10" into scenario weights."""
+    mix = {}
+    for item in spec.split(","):
+        name, weight = item.split("=", 1)
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight)
+    return mix
+
+def _stream_session_id(body: str) -> Optional[str]:
+    """The session id from the stream's opening "session" event."""
+    if not body.startswith("event: session\ndata: "):
+        return None
+    return json.loads(body.split("\n", 2)[1][len("data: "):])["session_id"]
+
+def _stream_failed(response) -> bool:
+    """A stream that started fine can still end in an error event."""
+    return "event: error" in response.text
+
+async def drive(
+    clients: List[Client],
+    mix: Dict[str, float],
+    recorder: Recorder,
+    until: float,
+    max_requests: Optional[int] = None
+):
+    """
+    Closed-loop load: each client sends its next request as soon as the
+    last one is answered, until the time is up or max_requests were sent.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    sent = itertools.count()
+
+    async def loop(client: Client):
+        while time.perf_counter() < until and (max_requests is None or next(sent) < max_requests):
+            name = random.choices(names, weights)[0]
+            endpoint, call = SCENARIOS[name]
+            start = time.perf_counter()
+            error = None
+            try:
+                response = await call(client)
+                if response.status_code >= 400:
+                    error = str(response.status_code)
+                elif name == "chat_stream" and _stream_failed(response):
+                    error = "stream_error"
+            except Exception as e:
+                error = type(e).__name__
+            recorder.record(name, endpoint, time.perf_counter() - start, error)
+
+    await asyncio.gather(*(loop(client) for client in clients))
+
+def build_chatbot(args):
+    """The real Chatbot, wired to the fakes and loaded with the FAQ."""
+    from app.core.chatbot import Chatbot
+    from app.core.vector_store import VectorStore
+    from scripts.load_faqs import parse_markdown_file
+    from .fakes import FakeEmbedder, FakeGeminiModel, FakePineconeBackend, LatencyProfile
+
+    vector_store = VectorStore(
+        embedder=FakeEmbedder(VectorStore.DIMENSION, LatencyProfile(args.embed_ms, args.embed_jitter_ms)),
+        backend=FakePineconeBackend(
+            VectorStore.DIMENSION,
+            LatencyProfile(args.vector_ms, args.vector_jitter_ms, args.vector_error_rate)
+        )
+    )
+    documents = parse_markdown_file(FAQ_PATH)
+    vector_store.add_documents(documents)
+
+    chatbot = Chatbot(api_key="benchmark", vector_store=vector_store)
+    llm = LatencyProfile(args.llm_ms, args.llm_jitter_ms, args.llm_error_rate)
+    chatbot.model = FakeGeminiModel(llm, chunk_ms=args.llm_chunk_ms)
+    if chatbot.fallback_model is not None:
+        chatbot.fallback_model = FakeGeminiModel(llm, chunk_ms=args.llm_chunk_ms)
+    return chatbot, [doc["metadata"]["question"] for doc in documents]
+
+async def run(args) -> Dict[str, Any]:
+    """Start the app, warm it up, put it under load and summarize."""
+    import httpx
+    from app import state
+    from app.main import app
+
+    mix = parse_mix(args.mix)
+    chatbot, questions = build_chatbot(args)
+    # Already built, so the startup warm-up and get_chatbot use it
+    state.chatbot_instance = chatbot
+
+    async with app.router.lifespan_context(app):
+        while not state.ready and not state.warmup_error:
+            await asyncio.sleep(0.05)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as http:
+            clients = [Client(http, questions, args.repeat_rate) for _ in range(args.concurrency)]
+            await asyncio.gather(*(client.setup() for client in clients))
+
+            # Warm caches and pools without recording anything
+            if args.warmup > 0:
+                await drive(clients, mix, Recorder(), time.perf_counter() + args.warmup)
+
+            recorder = Recorder()
+            start = time.perf_counter()
+            until = start + args.duration if args.requests is None else float("inf")
+            await drive(clients, mix, recorder, until, args.requests)
+            elapsed = time.perf_counter() - start
+
+    return {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "describe": _git("describe", "--always", "--dirty"),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": vars(args),
+        "results": summarize(recorder, elapsed),
+    }
+
+def _git(*command: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *command],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _configure_environment(data_dir: str):
+    """
+    Point the app at a scratch database and keep it quiet. Set before the
+    app is imported (settings are read once), anything already in the
+    environment wins.
+    """
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(data_dir, 'benchmark.db')}")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Ready-made answers would skip the LLM for most FAQ questions
+    os.environ.setdefault("DIRECT_ANSWERS", "false")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_argument_group("load")
+    load.add_argument("--duration", type=float, default=30.0, help="Seconds of measured load (default 30)")
+    load.add_argument("--requests", type=int, default=None, help="Send this many requests instead of running for --duration")
+    load.add_argument("--warmup", type=float, default=3.0, help="Seconds of unmeasured load first (default 3)")
+    load.add_argument("--concurrency", type=int, default=32, help="Concurrent clients (default 32)")
+    load.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default {DEFAULT_MIX})")
+    load.add_argument("--repeat-rate", type=float, default=0.3, help="Share of chat messages asked verbatim, so cacheable (default 0.3)")
+    load.add_argument("--seed", type=int, default=None, help="Random seed, for repeatable request sequences")
+
+    fakes = parser.add_argument_group("stand-ins")
+    fakes.add_argument("--llm-ms", type=float, default=800.0, help="Gemini latency (default 800)")
+    fakes.add_argument("--llm-jitter-ms", type=float, default=300.0, help="Gemini mean extra latency (default 300)")
+    fakes.add_argument("--llm-error-rate", type=float, default=0.01, help="Share of Gemini calls failing with a 503 (default 0.01)")
+    fakes.add_argument("--llm-chunk-ms", type=float, default=20.0, help="Gap between streamed chunks (default 20)")
+    fakes.add_argument("--vector-ms", type=float, default=40.0, help="Pinecone query latency (default 40)")
+    fakes.add_argument("--vector-jitter-ms", type=float, default=15.0, help="Pinecone mean extra latency (default 15)")
+    fakes.add_argument("--vector-error-rate", type=float, default=0.0, help="Share of Pinecone queries failing (default 0)")
+    fakes.add_argument("--embed-ms", type=float, default=10.0, help="Embedding time per batch (default 10)")
+    fakes.add_argument("--embed-jitter-ms", type=float, default=3.0, help="Embedding mean extra time (default 3)")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", help="Write the JSON report here instead of stdout")
+    output.add_argument("--baseline", help="An earlier JSON report to compare against")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    """Main function."""
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # The app logs to stdout, send that to stderr so stdout is just the report
+    with tempfile.TemporaryDirectory(prefix="ellie-bench-") as data_dir, contextlib.redirect_stdout(sys.stderr):
+        _configure_environment(data_dir)
+        report = asyncio.run(run(args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    # The table for people on stderr, the JSON for tools on stdout (or a file)
+    print(format_table(report), file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,25 @@
 #!/usr/bin/env python3
-"""Script to check Pinecone index and load FAQ data if needed."""
+"""Script to make sure the vector index has the current FAQ data."""
 import sys
 import os
+import logging
 
 # Add app directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from app.core.vector_store import VectorStore
-from load_faqs import parse_markdown_file
+from app.core.kb_sync import sync_documents
+from app.core.direct_answers import update_direct_answers
+from load_faqs import parse_markdown_file, print_progress
 
 def main():
-    """Check if Pinecone has data and load if needed."""
+    """Sync the FAQ data into the vector index, only loading what changed."""
     try:
-        print("Checking Pinecone index status...")
+        print("Checking vector index status...")
         
         # Initialize vector store
         vector_store = VectorStore()
         
-        # Check if index has data by doing a test query
-        try:
-            test_results = vector_store.search("test query", top_k=1)
-            
-            if test_results and len(test_results) > 0:
-                print(f"✓ Pinecone index has data ({len(test_results)} results found)")
-                return
-            else:
-                print("⚠ Pinecone index appears to be empty")
-        except Exception as e:
-            print(f"⚠ Could not query Pinecone index: {e}")
-        
-        # Load FAQ data
-        print("Loading FAQ data into Pinecone...")
         faq_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'fintech_faqs.md')
         
         if not os.path.exists(faq_path):
@@ -40,14 +29,28 @@ def main():
         documents = parse_markdown_file(faq_path)
         print(f"Parsed {len(documents)} FAQ documents")
         
-        # Add to vector store
-        print("Adding documents to Pinecone...")
-        vector_store.add_documents(documents)
-        print("✓ FAQ data loaded successfully!")
+        # The manifest tells us what's already indexed, so an up to date
+        # index costs nothing and an edit only re-embeds the changed docs
+        result = sync_documents(vector_store, documents, progress=print_progress)
+        if result["added"] or result["updated"] or result["deleted"]:
+            print(
+                f"✓ FAQ data synced: {result['added']} added, {result['updated']} updated, "
+                f"{result['deleted']} deleted"
+            )
+        else:
+            print(f"✓ Vector index is up to date ({result['unchanged']} documents)")
+        
+        answers = update_direct_answers(vector_store, documents)
+        if answers and (answers["generated"] or answers["removed"]):
+            print(f"✓ Direct answers synced: {answers['generated']} generated, {answers['removed']} removed")
+        if answers and answers["failed"]:
+            print(f"✗ {answers['failed']} direct answers failed to generate, they'll be retried next time")
         
     except Exception as e:
         print(f"✗ Error: {e}")
-        print("You may need to check your Pinecone API key and configuration")
+        print("You may need to check your vector store (Pinecone) API key and configuration")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # Show the app's progress messages, as plain lines
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,119 @@
+"""Script to export the embedding model to ONNX and check it against PyTorch."""
+import argparse
+import sys
+import os
+import time
+import numpy as np
+
+# Add app directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.core.embedders import MODEL_NAME, OnnxEmbedder, SentenceTransformerEmbedder
+from app.core.settings import get_settings
+from load_faqs import parse_markdown_file
+
+def export(output_dir: str):
+    """Export the transformer to ONNX, plus its tokenizer."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print(f"Exporting {MODEL_NAME} to {output_dir}...")
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+
+    # Writes tokenizer.json, which is all the ONNX backend needs
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["An example sentence to trace the model with"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, OnnxEmbedder.MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+def quantize(output_dir: str):
+    """
+    Make an int8 copy of the exported model (dynamic quantization).
+    onnxruntime's quantizer needs the onnx package as well.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print("Quantizing to int8...")
+    quantize_dynamic(
+        os.path.join(output_dir, OnnxEmbedder.MODEL_FILE),
+        os.path.join(output_dir, OnnxEmbedder.QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8
+    )
+
+def nearest_neighbours(embeddings: np.ndarray) -> np.ndarray:
+    """Index of each row's most similar other row."""
+    scores = embeddings @ embeddings.T
+    np.fill_diagonal(scores, -np.inf)
+    return scores.argmax(axis=1)
+
+def timed_encode(embedder, texts, batch_size: int = 32):
+    """Encode in batches, returning the embeddings and the seconds it took."""
+    start = time.perf_counter()
+    rows = [embedder.encode(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    return np.concatenate(rows), time.perf_counter() - start
+
+def check_parity(output_dir: str, quantized_variants, texts, min_cosine: float) -> bool:
+    """
+    Compare ONNX embeddings with the PyTorch ones on our own documents.
+    Reports the cosine agreement, whether each doc's nearest neighbour is
+    unchanged, and the speed. Passes if every cosine is at least min_cosine.
+    """
+    print(f"Checking parity on {len(texts)} documents...")
+    reference, reference_seconds = timed_encode(SentenceTransformerEmbedder(MODEL_NAME), texts)
+    reference_neighbours = nearest_neighbours(reference)
+    print(f"  pytorch:  {len(texts) / reference_seconds:.0f} docs/s")
+
+    ok = True
+    for quantized in quantized_variants:
+        name = "onnx-int8" if quantized else "onnx-fp32"
+        embeddings, seconds = timed_encode(OnnxEmbedder(output_dir, quantized=quantized), texts)
+        cosines = (reference * embeddings).sum(axis=1)
+        agreement = (nearest_neighbours(embeddings) == reference_neighbours).mean()
+        passed = cosines.min() >= min_cosine
+        ok = ok and passed
+        print(
+            f"  {name}: {len(texts) / seconds:.0f} docs/s, "
+            f"cosine mean {cosines.mean():.4f} min {cosines.min():.4f}, "
+            f"nearest neighbour agreement {agreement:.1%} "
+            f"[{'PASS' if passed else 'FAIL'}]"
+        )
+    return ok
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=get_settings().onnx_model_path, help="Model directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 model")
+    parser.add_argument("--check-only", action="store_true", help="Only check an existing export")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Lowest acceptable cosine vs PyTorch")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export(args.output)
+        if not args.no_quantize:
+            quantize(args.output)
+
+    # Check against the FAQs, that's what we actually embed
+    faq_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'fintech_faqs.md')
+    texts = [doc["text"] for doc in parse_markdown_file(faq_path)]
+    variants = [False] if args.no_quantize else [False, True]
+
+    if not check_parity(args.output, variants, texts, args.min_cosine):
+        print("Parity check failed, don't switch EMBEDDING_BACKEND to onnx with this export")
+        sys.exit(1)
+    print("Parity check passed")
+
+if __name__ == "__main__":
+    main()
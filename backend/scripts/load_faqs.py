@@ -1,6 +1,7 @@
 """Script to load FAQ data into Pinecone."""
 import sys
 import os
+import logging
 import markdown
 from bs4 import BeautifulSoup
 from typing import List, Dict, Any
@@ -56,6 +57,10 @@ def parse_markdown_file(file_path: str) -> List[Dict[str, Any]]:
     
     return documents
 
+def print_progress(stats: Dict[str, Any]):
+    """Print ingestion progress."""
+    print(f"  {stats['documents']} docs in {stats['seconds']:.1f}s ({stats['docs_per_sec']:.1f} docs/s)")
+
 def main():
     """Main function."""
     # Initialize vector store
@@ -68,9 +73,11 @@ def main():
     print(f"Loaded {len(documents)} FAQ documents")
     
     # Add to vector store
-    print("Adding documents to Pinecone...")
-    vector_store.add_documents(documents)
-    print("Done!")
+    print("Adding documents to the vector store...")
+    stats = vector_store.add_documents(documents, progress=print_progress)
+    print(f"Done! {stats['documents']} docs in {stats['seconds']:.1f}s")
 
 if __name__ == "__main__":
+    # Show the app's progress messages, as plain lines
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main() 
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""Script to incrementally sync FAQ data into the vector store."""
+import sys
+import os
+import logging
+
+# Add app directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.core.vector_store import VectorStore
+from app.core.kb_sync import sync_documents
+from app.core.direct_answers import update_direct_answers
+from load_faqs import parse_markdown_file, print_progress
+
+def main():
+    """Main function."""
+    # Initialize vector store
+    vector_store = VectorStore()
+    
+    # Load and parse FAQ data
+    faq_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'fintech_faqs.md')
+    documents = parse_markdown_file(faq_path)
+    print(f"Parsed {len(documents)} FAQ documents")
+    
+    # Only new/changed docs get embedded, removed ones get deleted
+    result = sync_documents(vector_store, documents, progress=print_progress)
+    print(
+        f"Sync done: {result['added']} added, {result['updated']} updated, "
+        f"{result['deleted']} deleted, {result['unchanged']} unchanged"
+    )
+    
+    # Ready-made answers for the FAQ fast path, only new FAQs cost an LLM call
+    answers = update_direct_answers(vector_store, documents)
+    if answers is None:
+        print("Direct answers are off (or there's no Gemini API key), skipping")
+    else:
+        print(
+            f"Direct answers: {answers['generated']} generated, {answers['removed']} removed, "
+            f"{answers['failed']} failed, {answers['unchanged']} unchanged"
+        )
+
+if __name__ == "__main__":
+    # Show the app's progress messages, as plain lines
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
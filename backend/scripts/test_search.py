@@ -1,6 +1,7 @@
 """Script to test FAQ search."""
 import sys
 import os
+import logging
 
 # Add app directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -33,4 +34,6 @@ def main():
             print(f"Text:\n{result['text']}")
 
 if __name__ == "__main__":
+    # Show the app's progress messages, as plain lines
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main() 
\ No newline at end of file
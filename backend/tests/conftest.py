@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.app.models.database import Base
+
+@pytest.fixture
+def engine():
+    """
+    An empty in-memory database. StaticPool hands every session the same
+    single connection, so this can't show pool exhaustion.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    """A session factory for the in-memory database, with the tables created."""
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    """A session on the in-memory database."""
+    db = session_factory()
+    yield db
+    db.close()
+
+class FakeVectorStore:
+    """
+    Records what a sync asks the vector store to do. Embeddings come from
+    the vectors given for each text.
+    """
+    
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+        self.added = []
+        self.deleted = []
+    
+    def encode_batch(self, texts):
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+    
+    def add_documents(self, documents, progress=None):
+        self.added.extend(documents)
+    
+    def delete_documents(self, ids):
+        self.deleted.extend(ids)
+
+@pytest.fixture
+def fake_vector_store():
+    """Makes FakeVectorStores, pass vectors for texts that get embedded."""
+    return FakeVectorStore
+
+@pytest.fixture
+def faq():
+    """Makes an FAQ doc the way load_faqs does."""
+    def make(question, answer):
+        return {"text": f"Q: {question}\nA: {answer}", "metadata": {"section": "General", "question": question}}
+    return make
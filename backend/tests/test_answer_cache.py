@@ -0,0 +1,37 @@
+import numpy as np
+from backend.app.core.answer_cache import SemanticAnswerCache
+
+def test_answer_cache_similar_query_same_context():
+    """
+    Tests that a similar query with the same retrieved docs hits the cache.
+    """
+    cache = SemanticAnswerCache(maxsize=10, ttl=None, threshold=0.95)
+    cache.store(np.array([1.0, 0.0, 0.0]), ["doc1", "doc2"], "cached answer")
+    
+    # 1. Close enough and same context is a hit
+    assert cache.lookup(np.array([1.0, 0.05, 0.0]), ["doc1", "doc2"]) == "cached answer"
+    
+    # 2. Same embedding but different context is a miss
+    assert cache.lookup(np.array([1.0, 0.0, 0.0]), ["doc3"]) is None
+    
+    # 3. Same context but too different a question is a miss
+    assert cache.lookup(np.array([0.5, 0.5, 0.0]), ["doc1", "doc2"]) is None
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_answer_cache_eviction_and_invalidate():
+    """
+    Tests LRU eviction and that invalidate drops all entries.
+    """
+    cache = SemanticAnswerCache(maxsize=1, ttl=None, threshold=0.95)
+    cache.store(np.array([1.0, 0.0]), ["a"], "first")
+    cache.store(np.array([0.0, 1.0]), ["b"], "second")
+    
+    assert len(cache) == 1
+    assert cache.lookup(np.array([1.0, 0.0]), ["a"]) is None
+    assert cache.lookup(np.array([0.0, 1.0]), ["b"]) == "second"
+    
+    cache.invalidate()
+    assert cache.lookup(np.array([0.0, 1.0]), ["b"]) is None
@@ -1,4 +1,6 @@
-from backend.app.core.auth import verify_password, hash_password
+import asyncio
+from backend.app.core.auth import make_password_context, verify_password, hash_password
+from backend.app.core.password_hashing import ahash_password, averify_password, hashing_stats, shutdown_hashing_pool
 
 def test_password_hashing():
     """
@@ -26,4 +28,44 @@ def test_verify_password_edge_cases():
     hashed_password = hash_password(password)
     
     # Test with an empty string password
-    assert verify_password("", hashed_password) is False 
\ No newline at end of file
+    assert verify_password("", hashed_password) is False 
+
+
+def test_rehash_on_cost_change():
+    """
+    Tests that a hash with an outdated cost is upgraded when the password is verified.
+    """
+    password = "a_secure_password123"
+    # Both costs set here, so this holds whatever BCRYPT_ROUNDS is
+    old_hash = make_password_context(4).hash(password)
+    current = make_password_context(5)
+    
+    # 1. The right password matches and comes back with a new hash
+    valid, new_hash = current.verify_and_update(password, old_hash)
+    assert valid is True
+    assert new_hash is not None and new_hash != old_hash
+    
+    # 2. A current hash needs no update
+    assert current.verify_and_update(password, new_hash) == (True, None)
+    
+    # 3. A wrong password never produces a hash
+    assert current.verify_and_update("wrong_password", old_hash) == (False, None)
+
+def test_hashing_pool():
+    """
+    Tests hashing and verifying in the process pool, and its stats.
+    """
+    async def run():
+        hashed = await ahash_password("a_secure_password123")
+        return hashed, await averify_password("a_secure_password123", hashed)
+    
+    try:
+        hashed, (valid, new_hash) = asyncio.run(run())
+    finally:
+        shutdown_hashing_pool()
+    
+    assert verify_password("a_secure_password123", hashed) is True
+    assert valid is True and new_hash is None
+    stats = hashing_stats()
+    assert stats["completed"] >= 2
+    assert stats["in_flight"] == 0
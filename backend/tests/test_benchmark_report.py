@@ -0,0 +1,50 @@
+from backend.benchmarks.report import Recorder, compare, format_table, summarize
+
+def test_summary_has_rps_errors_and_percentiles():
+    """
+    Tests the per-scenario and overall numbers in a benchmark report.
+    """
+    recorder = Recorder()
+    for ms in range(1, 101):
+        recorder.record("me", "GET /api/auth/me", ms / 1000)
+    recorder.record("chat", "POST /api/chat", 2.0, error="503")
+    recorder.record("chat", "POST /api/chat", 1.0)
+
+    results = summarize(recorder, elapsed=10.0)
+
+    # 1. Throughput and percentiles per scenario, in ms
+    me = results["scenarios"]["me"]
+    assert me["endpoint"] == "GET /api/auth/me"
+    assert me["requests"] == 100 and me["rps"] == 10.0
+    assert me["latency_ms"]["p50"] == 50.5
+    assert me["latency_ms"]["max"] == 100.0
+
+    # 2. Errors counted by kind
+    chat = results["scenarios"]["chat"]
+    assert chat["errors"] == 1 and chat["error_rate"] == 0.5
+    assert chat["errors_by_kind"] == {"503": 1}
+
+    # 3. Overall covers every request
+    assert results["overall"]["requests"] == 102
+    assert results["overall"]["errors"] == 1
+
+def test_compare_against_a_baseline():
+    """
+    Tests the relative change against an earlier report.
+    """
+    def report(rps, p95):
+        latency = {"p50": 10.0, "p95": p95, "p99": 0.0, "mean": 10.0, "max": p95}
+        scenario = {"endpoint": "POST /api/chat", "requests": 10, "errors": 0, "error_rate": 0.0, "rps": rps, "latency_ms": latency}
+        return {"results": {"scenarios": {"chat": scenario}, "overall": scenario}}
+
+    current = report(rps=12.0, p95=90.0)
+    current["comparison"] = compare(current, report(rps=10.0, p95=100.0))
+
+    # 1. Positive is more, a zero baseline can't be compared
+    assert current["comparison"]["chat"]["rps_pct"] == 20.0
+    assert current["comparison"]["chat"]["p95_pct"] == -10.0
+    assert current["comparison"]["chat"]["p99_pct"] is None
+
+    # 2. The table shows the changes under the scenario
+    table = format_table(current)
+    assert "+20.0%" in table and "-10.0%" in table and "n/a" in table
@@ -0,0 +1,38 @@
+import time
+from backend.app.core.cache import TTLCache
+
+def test_cache_lru_eviction():
+    """
+    Tests that the least recently used entry is evicted when the cache is full.
+    """
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    # Touch "a" so "b" becomes the oldest
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+def test_cache_ttl_and_disabled():
+    """
+    Tests that entries expire after the ttl and a zero-size cache stores nothing.
+    """
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    
+    disabled = TTLCache(maxsize=0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+    assert len(disabled) == 0
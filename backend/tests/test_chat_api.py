@@ -0,0 +1,182 @@
+import asyncio
+import json
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from backend.app.api import chat as chat_api
+from backend.app.core.database import get_db
+from backend.app.main import app
+from backend.app.models.database import Base
+from backend.app.services.session_service import SessionService
+
+class SlowChatbot:
+    """Stands in for Gemini: answers after a delay, like a real LLM call."""
+    request_timeout = 30
+
+    async def achat(self, message, conversation, deadline):
+        await asyncio.sleep(0.2)
+        return f"answer to {message}"
+
+    async def asummarize(self, previous_summary, turns):
+        return None
+
+class StreamingChatbot:
+    """Stands in for Gemini's streaming: plays back a scripted list of events."""
+    request_timeout = 30
+
+    def __init__(self, events, delay=0.0):
+        self.events = events
+        self.delay = delay
+
+    async def achat_stream(self, message, conversation, deadline):
+        for event in self.events:
+            yield event
+            await asyncio.sleep(self.delay)
+
+    async def asummarize(self, previous_summary, turns):
+        return None
+
+def make_pooled_engine(tmp_path):
+    """
+    A file database on a real pool, much smaller than the number of chats
+    in flight, that gives up quickly instead of waiting the default 30s.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'chat.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=1
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def pooled_app(tmp_path, monkeypatch):
+    """The app saving to a pooled file database, yields its session factory."""
+    engine = make_pooled_engine(tmp_path)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(chat_api, "SessionLocal", session_factory)
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    yield session_factory
+    engine.dispose()
+
+async def stream_chat(message, disconnect_on=None):
+    """
+    Call /api/chat/stream straight through ASGI and return its events as
+    (event, data) pairs. With disconnect_on, the client goes away right
+    after it receives that event.
+    """
+    body = json.dumps({"message": message}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat/stream",
+        "raw_path": b"/api/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("test", 1234),
+        "server": ("test", 80),
+    }
+    sent_body = False
+    gone = asyncio.Event()
+    chunks = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message["body"]:
+            chunks.append(message["body"].decode())
+            if disconnect_on and f"event: {disconnect_on}\n" in chunks[-1]:
+                gone.set()
+
+    await app(scope, receive, send)
+    events = []
+    for block in "".join(chunks).split("\n\n"):
+        if block:
+            event, data = block.split("\n", 1)
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_concurrent_chats_are_saved_on_a_pooled_engine(pooled_app, monkeypatch):
+    """
+    Tests that more concurrent chats than pooled connections all get their turns saved.
+    """
+    session_factory = pooled_app
+    monkeypatch.setitem(app.dependency_overrides, chat_api.get_chatbot, SlowChatbot)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post("/api/chat", json={"message": f"question {i}"}) for i in range(8)
+            ])
+
+    responses = asyncio.run(run())
+
+    # 1. Every chat succeeded and got real message ids back
+    assert [r.status_code for r in responses] == [200] * 8
+    bodies = [r.json() for r in responses]
+    assert all(body["cursor"] is not None for body in bodies)
+    assert all(message["id"] is not None for body in bodies for message in body["messages"])
+
+    # 2. And every turn is actually in the database
+    service = SessionService(session_factory())
+    for i, body in enumerate(bodies):
+        history = service.get_chat_history(body["session_id"])
+        assert [m["content"] for m in history] == [f"question {i}", f"answer to question {i}"]
+
+def test_chat_stream_events_and_saving(pooled_app, monkeypatch):
+    """
+    Tests the stream's event order, that an error replaces partial text, and saving on disconnect.
+    """
+    service = SessionService(pooled_app())
+    metadata = {"type": "metadata", "sources": []}
+
+    def use(chatbot):
+        monkeypatch.setitem(app.dependency_overrides, chat_api.get_chatbot, lambda: chatbot)
+
+    def saved(events):
+        history = service.get_chat_history(events[0][1]["session_id"])
+        return [m["content"] for m in history]
+
+    # 1. session, metadata, tokens, done, and the whole answer gets saved
+    use(StreamingChatbot([metadata, {"type": "token", "text": "Hel"}, {"type": "token", "text": "lo"}]))
+    events = asyncio.run(stream_chat("Hi"))
+    assert [event for event, _ in events] == ["session", "metadata", "token", "token", "done"]
+    assert events[-1][1]["response"] == "Hello"
+    assert saved(events) == ["Hi", "Hello"]
+
+    # 2. An error replaces what was streamed before it
+    use(StreamingChatbot([metadata, {"type": "token", "text": "Half an ans"}, {"type": "error", "text": "Sorry"}]))
+    events = asyncio.run(stream_chat("Hi again"))
+    assert [event for event, _ in events] == ["session", "metadata", "token", "error", "done"]
+    assert events[-1][1]["response"] == "Sorry"
+    assert saved(events) == ["Hi again", "Sorry"]
+
+    # 3. A client that leaves mid-stream still gets what it saw saved
+    use(StreamingChatbot([metadata, {"type": "token", "text": "Par"}, {"type": "token", "text": "tial"}], delay=1))
+    events = asyncio.run(stream_chat("Bye", disconnect_on="token"))
+    assert [event for event, _ in events] == ["session", "metadata", "token"]
+    assert saved(events) == ["Bye", "Par"]
@@ -0,0 +1,46 @@
+from backend.app.core.context_builder import select_context, trim_to_passages
+from backend.app.core.tokens import estimate_tokens
+
+def doc(doc_id, text, similarity):
+    return {"id": doc_id, "text": text, "metadata": {"section": "General"}, "similarity": similarity}
+
+def test_select_context_floor_dedupe_and_budget():
+    """
+    Tests that weak matches and near-duplicates are dropped and the budget is kept.
+    """
+    fees = "Q: What are the transfer fees?\nA: Domestic transfers are free. International transfers cost 1%."
+    docs = [
+        doc("a", fees, 0.8),
+        doc("b", fees + " ", 0.7),
+        doc("c", "Q: How do I reset my password?\nA: Use the forgot password link.", 0.1),
+        doc("d", "Q: What are the limits?\nA: " + "Limits depend on the account. " * 50, 0.6),
+    ]
+    
+    picked = select_context("transfer fees", docs, token_budget=120, similarity_floor=0.3)
+    
+    # 1. The duplicate and the weak match are gone
+    assert [d["id"] for d in picked] == ["a", "d"]
+    
+    # 2. The long doc was trimmed to fit
+    assert sum(estimate_tokens(d["text"]) for d in picked) <= 120
+    assert picked[1]["text"].startswith("Q: What are the limits?")
+
+def test_trim_keeps_relevant_passages():
+    """
+    Tests that trimming keeps the question and the passages about the query.
+    """
+    text = (
+        "Q: What cards do you offer?\n"
+        "A: We offer debit cards for every account. "
+        "Virtual cards can be created in the app. "
+        "Metal cards come with the Pro plan and have no foreign transaction fees. "
+        "Cards can be frozen at any time."
+    )
+    query_terms = {"metal", "pro"}
+    
+    trimmed = trim_to_passages(text, query_terms, max_tokens=30)
+    
+    assert trimmed.startswith("Q: What cards do you offer?")
+    assert "Metal cards" in trimmed
+    assert "..." in trimmed
+    assert estimate_tokens(trimmed) <= 30
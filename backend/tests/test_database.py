@@ -0,0 +1,23 @@
+from sqlalchemy import text
+from backend.app.core.database import make_engine
+from backend.app.core.settings import Settings
+
+def test_sqlite_pragmas(tmp_path):
+    """
+    Tests that SQLite connections come up in WAL mode with the tuning pragmas.
+    """
+    settings = Settings(
+        gemini_api_key="",
+        pinecone_api_key="",
+        database_url=f"sqlite:///{tmp_path / 'chat.db'}",
+        sqlite_busy_timeout_ms=1234,
+        sqlite_cache_size_kb=2048,
+    )
+    engine = make_engine(settings)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # 1 is NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -2048
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from backend.app.core.deadlines import Deadline, hedged
+
+def test_deadline_stage_is_capped_by_the_deadline():
+    """
+    Tests that a stage gets its own limit but never more than what's left.
+    """
+    deadline = Deadline(10)
+
+    # 1. A shorter stage limit wins
+    assert deadline.stage(2).remaining() <= 2
+
+    # 2. A longer one is capped by the deadline
+    assert 9 < deadline.stage(60).remaining() <= 10
+
+    # 3. Nothing is left once it has passed
+    assert Deadline(0).expired()
+
+def test_hedged_races_the_backup_when_primary_is_slow():
+    """
+    Tests that the backup starts after hedge_after and the first result wins.
+    """
+    started = []
+
+    def make(name, delay, fail=False):
+        async def call():
+            started.append(name)
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError(name)
+            return name
+        return call
+
+    # 1. A fast primary never starts the backup
+    assert asyncio.run(hedged(make("primary", 0), make("backup", 0), 0.5, 1)) == "primary"
+    assert started == ["primary"]
+
+    # 2. A slow primary loses to the backup
+    started.clear()
+    assert asyncio.run(hedged(make("primary", 1), make("backup", 0), 0.05, 2)) == "backup"
+    assert started == ["primary", "backup"]
+
+    # 3. A failed primary starts the backup straight away
+    assert asyncio.run(hedged(make("primary", 0, fail=True), make("backup", 0), 10, 1)) == "backup"
+
+    # 4. Nothing in time is a timeout
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hedged(make("primary", 1), make("backup", 1), 0.01, 0.05))
+
+def test_hedged_discards_the_losing_result():
+    """
+    Tests that when both calls succeed together the unused result goes to discard.
+    """
+    discarded = []
+
+    async def run():
+        gate = asyncio.Event()
+
+        def make(name):
+            async def call():
+                await gate.wait()
+                return name
+            return call
+
+        async def discard(result):
+            discarded.append(result)
+
+        # Both calls wake on the same tick, so they finish together
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+        return await hedged(make("primary"), make("backup"), 0, 1, discard=discard)
+
+    winner = asyncio.run(run())
+
+    # 1. One result is returned and the other one discarded
+    assert sorted([winner] + discarded) == ["backup", "primary"]
+
+    # 2. A call that's still running is just cancelled
+    discarded.clear()
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    async def discard(result):
+        discarded.append(result)
+
+    assert asyncio.run(hedged(slow, fast, 0, 2, discard=discard)) == "fast"
+    assert discarded == []
@@ -0,0 +1,51 @@
+import numpy as np
+from backend.app.core.direct_answers import DirectAnswerStore, sync_direct_answers
+from backend.app.core.vector_store import document_id
+
+# Each question gets its own direction, so questions are easy to tell apart
+QUESTION_VECTORS = {"a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0]}
+
+def test_sync_generates_only_missing_answers(tmp_path, fake_vector_store, faq):
+    """
+    Tests that a sync only asks for answers it doesn't have, and drops removed FAQs.
+    """
+    path = str(tmp_path / "answers.json")
+    vector_store = fake_vector_store(QUESTION_VECTORS)
+    asked = []
+    
+    def generate(doc):
+        asked.append(doc["metadata"]["question"])
+        return f"Ellie says {doc['text'].split('A: ')[1]}"
+    
+    # 1. First sync generates everything
+    result = sync_direct_answers(vector_store, [faq("a", "1"), faq("b", "2")], DirectAnswerStore(path), generate)
+    assert result["generated"] == 2
+    
+    # 2. Editing one FAQ only regenerates that one, removing one drops it
+    asked.clear()
+    result = sync_direct_answers(vector_store, [faq("a", "1 edited")], DirectAnswerStore(path), generate)
+    assert asked == ["a"]
+    assert result["removed"] == 2
+    assert len(DirectAnswerStore(path)) == 1
+
+def test_match_needs_threshold_and_margin(tmp_path, fake_vector_store, faq):
+    """
+    Tests that only a clear, close match gets a direct answer.
+    """
+    vector_store = fake_vector_store(QUESTION_VECTORS)
+    docs = [faq("a", "1"), faq("b", "2")]
+    store = DirectAnswerStore(str(tmp_path / "answers.json"))
+    sync_direct_answers(vector_store, docs, store, lambda doc: doc["text"])
+    ids = [document_id(doc["text"], doc["metadata"]) for doc in docs]
+    
+    # 1. Right on question a
+    assert store.match(np.array([1.0, 0.0, 0.0]), ids, threshold=0.9, margin=0.05) == "Q: a\nA: 1"
+    
+    # 2. Halfway between a and b is ambiguous
+    assert store.match(np.array([1.0, 1.0, 0.0]), ids, threshold=0.5, margin=0.05) is None
+    
+    # 3. Not close enough to anything
+    assert store.match(np.array([0.3, 0.0, 1.0]), ids, threshold=0.9, margin=0.05) is None
+    
+    # 4. Only retrieved docs count
+    assert store.match(np.array([1.0, 0.0, 0.0]), ids[1:], threshold=0.9, margin=0.05) is None
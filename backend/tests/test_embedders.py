@@ -0,0 +1,21 @@
+import numpy as np
+from backend.app.core.embedders import mean_pool
+
+def test_mean_pool_ignores_padding():
+    """
+    Tests that pooling averages only real tokens and normalizes the result.
+    """
+    token_embeddings = np.array([
+        [[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]],
+        [[0.0, 2.0], [0.0, 4.0], [0.0, 6.0]],
+    ], dtype=np.float32)
+    attention_mask = np.array([[1, 1, 0], [1, 1, 1]])
+    
+    pooled = mean_pool(token_embeddings, attention_mask)
+    
+    # 1. The padded token doesn't leak into the first row
+    assert np.allclose(pooled, [[1.0, 0.0], [0.0, 1.0]])
+    
+    # 2. Rows are unit length float32
+    assert pooled.dtype == np.float32
+    assert np.allclose(np.linalg.norm(pooled, axis=1), 1.0)
@@ -0,0 +1,49 @@
+import threading
+import numpy as np
+import pytest
+from backend.app.core.embedding_batcher import EmbeddingBatcher
+
+def test_batcher_groups_concurrent_requests():
+    """
+    Tests that concurrent requests are encoded together and each caller gets its own vector.
+    """
+    calls = []
+    
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(t))] for t in texts])
+    
+    batcher = EmbeddingBatcher(encode, max_batch_size=16, max_wait_ms=50)
+    texts = ["a" * i for i in range(1, 9)]
+    results = {}
+    
+    def worker(text):
+        results[text] = batcher.encode(text)
+    
+    threads = [threading.Thread(target=worker, args=(t,)) for t in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+    
+    # 1. Fewer encode calls than requests
+    assert len(calls) < len(texts)
+    
+    # 2. Every caller got the row for its own text
+    for text in texts:
+        assert results[text][0] == len(text)
+
+def test_batcher_propagates_errors():
+    """
+    Tests that an encode failure is raised to the waiting caller.
+    """
+    def encode(texts):
+        raise RuntimeError("boom")
+    
+    batcher = EmbeddingBatcher(encode, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            batcher.encode("hello")
+    finally:
+        batcher.close()
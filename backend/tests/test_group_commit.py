@@ -0,0 +1,46 @@
+from sqlalchemy import event
+from backend.app.core.group_commit import GroupCommitWriter
+from backend.app.models.database import ChatMessage
+from backend.app.services.session_service import SessionService
+
+def test_group_commit(engine, session_factory, db):
+    """
+    Tests that queued turns are committed together and each caller gets its ids.
+    """
+    session_id = SessionService(db).create_anonymous_session()
+    
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    
+    # 1. A long wait so everything submitted lands in one batch
+    writer = GroupCommitWriter(session_factory, max_batch_size=10, max_wait_ms=200)
+    futures = [
+        writer.submit(lambda s, i=i: SessionService(s).add_turn(session_id, f"question {i}", f"answer {i}"))
+        for i in range(5)
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    writer.close()
+    
+    assert len(commits) == 1
+    assert all(assistant_id > user_id for user_id, assistant_id in results)
+    assert SessionService(db).get_session_info(session_id)["message_count"] == 10
+
+def test_bad_write_only_fails_itself(session_factory, db):
+    """
+    Tests that a failing write doesn't lose the rest of its batch, and close flushes the queue.
+    """
+    session_id = SessionService(db).create_anonymous_session()
+    
+    def bad_write(s):
+        # Missing the required role and content
+        s.add(ChatMessage(session_id=session_id))
+        s.flush()
+    
+    writer = GroupCommitWriter(session_factory, max_batch_size=10, max_wait_ms=200)
+    good = writer.submit(lambda s: SessionService(s).add_turn(session_id, "Hi", "Hello!"))
+    bad = writer.submit(bad_write)
+    writer.close()
+    
+    assert good.result()[1] is not None
+    assert bad.exception() is not None
+    assert SessionService(db).get_session_info(session_id)["message_count"] == 2
@@ -0,0 +1,31 @@
+from backend.app.core.kb_sync import sync_documents
+from backend.app.core.vector_store import document_id
+
+def test_sync_only_touches_changes(tmp_path, fake_vector_store, faq):
+    """
+    Tests that a sync embeds new/changed docs and deletes removed ones.
+    """
+    manifest_path = str(tmp_path / "manifest.json")
+    store = fake_vector_store()
+    
+    # 1. First sync loads everything
+    result = sync_documents(store, [faq("a", "1"), faq("b", "2"), faq("c", "3")], manifest_path)
+    assert result["added"] == 3
+    assert len(store.added) == 3
+    
+    # 2. Same docs again is a no-op
+    store = fake_vector_store()
+    result = sync_documents(store, [faq("a", "1"), faq("b", "2"), faq("c", "3")], manifest_path)
+    assert result["unchanged"] == 3
+    assert store.added == [] and store.deleted == []
+    
+    # 3. Edit one, drop one: only those are touched
+    store = fake_vector_store()
+    old_b = document_id(faq("b", "2")["text"], faq("b", "2")["metadata"])
+    old_c = document_id(faq("c", "3")["text"], faq("c", "3")["metadata"])
+    result = sync_documents(store, [faq("a", "1"), faq("b", "2 edited")], manifest_path)
+    assert result["updated"] == 1
+    assert result["deleted"] == 1
+    assert result["unchanged"] == 1
+    assert [doc["text"] for doc in store.added] == ["Q: b\nA: 2 edited"]
+    assert set(store.deleted) == {old_b, old_c}
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from backend.app.core.llm_governor import CircuitBreaker, LLMGovernor, LLMUnavailable
+
+class FakeAPIError(Exception):
+    """Stands in for a google.api_core error, which carries the HTTP status as code."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+def test_governor_retries_transient_errors():
+    """
+    Tests that 429/5xx errors are retried and other errors aren't.
+    """
+    governor = LLMGovernor(max_retries=3, backoff_base=0.001, backoff_max=0.001)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise FakeAPIError(429)
+        return "ok"
+
+    # 1. Two rate limits, then success
+    assert asyncio.run(governor.call(flaky)) == "ok"
+    assert len(attempts) == 3
+    assert governor.stats()["retries"] == 2
+
+    # 2. A bad request is not retried
+    async def bad_request():
+        attempts.append(1)
+        raise FakeAPIError(400)
+
+    attempts.clear()
+    with pytest.raises(FakeAPIError):
+        asyncio.run(governor.call(bad_request))
+    assert len(attempts) == 1
+    assert governor.stats()["circuit"] == "closed"
+
+def test_governor_sheds_when_queue_is_full():
+    """
+    Tests that calls past max_in_flight + max_queue fail fast.
+    """
+    governor = LLMGovernor(max_in_flight=1, max_queue=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "done"
+
+        # 1. One call runs, one waits
+        running = asyncio.create_task(governor.call(slow))
+        waiting = asyncio.create_task(governor.call(slow))
+        await asyncio.sleep(0)
+        assert governor.stats()["in_flight"] == 1
+        assert governor.stats()["waiting"] == 1
+
+        # 2. The third is shed straight away
+        with pytest.raises(LLMUnavailable, match="queue_full"):
+            await governor.call(slow)
+
+        release.set()
+        return await asyncio.gather(running, waiting)
+
+    assert asyncio.run(scenario()) == ["done", "done"]
+    assert governor.stats()["shed"] == 1
+    assert governor.stats()["in_flight"] == 0
+
+def test_circuit_breaker_opens_and_recovers():
+    """
+    Tests that repeated failures open the circuit and a probe closes it.
+    """
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    governor = LLMGovernor(max_retries=0, breaker=breaker)
+
+    async def unavailable():
+        raise FakeAPIError(503)
+
+    async def healthy():
+        return "ok"
+
+    # 1. Two failures in a row open it
+    for _ in range(2):
+        with pytest.raises(FakeAPIError):
+            asyncio.run(governor.call(unavailable))
+    assert breaker.state == "open"
+
+    # 2. While open (and not timed out) calls are refused
+    breaker.reset_timeout = 60
+    with pytest.raises(LLMUnavailable, match="circuit_open"):
+        asyncio.run(governor.call(healthy))
+
+    # 3. After the timeout a successful probe closes it
+    breaker.reset_timeout = 0
+    assert asyncio.run(governor.call(healthy)) == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,62 @@
+import json
+import logging
+import queue
+from backend.app.core.log import (
+    ContextFilter, DebugSampler, DroppingQueueHandler, JsonFormatter, parse_levels, request_id_var
+)
+
+def _record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_records_carry_context_and_extra_fields():
+    """
+    Tests that records are JSON with the request id and extra= fields.
+    """
+    token = request_id_var.set("req-1")
+    try:
+        record = _record(message_chars=11)
+        ContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    # 1. The basics, with the message formatted
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["message"] == "hello world"
+
+    # 2. Request context and extra fields at the top level, unset ids left out
+    assert entry["request_id"] == "req-1"
+    assert entry["message_chars"] == 11
+    assert "session_id" not in entry
+
+def test_queue_handler_drops_instead_of_blocking():
+    """
+    Tests that a full log queue drops records, and DEBUG sampling.
+    """
+    handler = DroppingQueueHandler(queue.Queue(1))
+
+    # 1. The second record doesn't fit and is counted as dropped
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+    # 2. The queued record has its message resolved
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "hello world" and queued.args is None
+
+    # 3. A sample rate of 0 drops DEBUG only
+    sampler = DebugSampler(0.0)
+    assert not sampler.filter(_record(level=logging.DEBUG))
+    assert sampler.filter(_record(level=logging.WARNING))
+
+    # 4. Per-logger levels parse from the env format
+    assert parse_levels("app.core.chatbot=debug, uvicorn=WARNING") == {
+        "app.core.chatbot": "DEBUG",
+        "uvicorn": "WARNING",
+    }
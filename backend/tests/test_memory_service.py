@@ -0,0 +1,65 @@
+from backend.app.models.database import Session as SessionModel, ChatMessage
+from backend.app.services.memory_service import MemoryService
+
+def test_memory_window_and_summary(db):
+    """
+    Tests that only recent turns are loaded and older ones are handed out for summarizing.
+    """
+    db.add(SessionModel(id="s1"))
+    for i in range(10):
+        db.add(ChatMessage(session_id="s1", role="user" if i % 2 == 0 else "assistant", content=f"message {i}"))
+    db.commit()
+    
+    memory = MemoryService(db, token_budget=1000, max_messages=4, summary_token_budget=100)
+    
+    # 1. Only the newest messages fit the window
+    context = memory.load("s1")
+    assert context.summary is None
+    assert [turn["content"] for turn in context.turns] == ["message 6", "message 7", "message 8", "message 9"]
+    
+    # 2. The rest is overflow to fold into the summary, oldest first
+    overflow = memory.get_overflow("s1")
+    assert [turn["content"] for turn in overflow["turns"]] == ["message 0", "message 1", "message 2", "message 3"]
+    assert memory.save_summary("s1", "earlier stuff", overflow["through_id"])
+    
+    # 3. The summary comes back with the window, and an older save can't overwrite it
+    context = memory.load("s1")
+    assert context.summary == "earlier stuff"
+    assert len(context.turns) == 4
+    assert not memory.save_summary("s1", "stale", overflow["through_id"] - 1)
+
+def test_memory_token_budget(db):
+    """
+    Tests that the token budget caps the window even with few messages.
+    """
+    db.add(SessionModel(id="s1"))
+    db.add(ChatMessage(session_id="s1", role="user", content="x" * 400))
+    db.add(ChatMessage(session_id="s1", role="assistant", content="short"))
+    db.commit()
+    
+    memory = MemoryService(db, token_budget=50, max_messages=20, summary_token_budget=100)
+    context = memory.load("s1")
+    assert [turn["content"] for turn in context.turns] == ["short"]
+
+def test_memory_compacts_in_batches(db):
+    """
+    Tests that overflow waits for a full batch and a long backlog is folded in order without gaps.
+    """
+    db.add(SessionModel(id="s1"))
+    for i in range(14):
+        db.add(ChatMessage(session_id="s1", role="user" if i % 2 == 0 else "assistant", content=f"message {i}"))
+    db.commit()
+    
+    # 1. 10 messages overflow, but each call folds at most max_messages of them
+    memory = MemoryService(db, token_budget=1000, max_messages=4, summary_token_budget=100, compact_batch=4)
+    overflow = memory.get_overflow("s1")
+    assert [turn["content"] for turn in overflow["turns"]] == [f"message {i}" for i in range(4)]
+    memory.save_summary("s1", "first part", overflow["through_id"])
+    
+    # 2. The next call picks up exactly where the summary stops
+    overflow = memory.get_overflow("s1")
+    assert [turn["content"] for turn in overflow["turns"]] == [f"message {i}" for i in range(4, 8)]
+    memory.save_summary("s1", "second part", overflow["through_id"])
+    
+    # 3. Only 2 left over, which is less than a batch
+    assert memory.get_overflow("s1") is None
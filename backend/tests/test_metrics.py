@@ -0,0 +1,55 @@
+from backend.app.core.metrics import MetricsRegistry, _request_timings, format_server_timing, span
+
+def test_registry_renders_prometheus_text():
+    """
+    Tests the text format for counters, histograms and collected samples.
+    """
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("queue_depth", "gauge", "Queued", {}, 3)])
+
+    requests.inc(route="/chat")
+    requests.inc(2, route="/chat")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    lines = registry.render().splitlines()
+
+    # 1. Counters sum per label
+    assert 'requests_total{route="/chat"} 3' in lines
+
+    # 2. Histogram buckets are cumulative, with +Inf, sum and count
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+    assert "latency_seconds_sum 5.55" in lines
+
+    # 3. Collected samples come with their type
+    assert "# TYPE queue_depth gauge" in lines
+    assert "queue_depth 3.0" in lines
+
+def test_spans_add_up_per_request():
+    """
+    Tests that spans inside a request are summed into its Server-Timing.
+    """
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        with span("db.save"):
+            pass
+        with span("db.save"):
+            pass
+        with span("llm"):
+            pass
+    finally:
+        _request_timings.reset(token)
+
+    # 1. Both db spans land under one name
+    assert list(timings) == ["db.save", "llm"]
+
+    # 2. The header lists each stage in ms, then the total
+    header = format_server_timing({"embed": 0.0123, "llm": 1.5}, 2.0)
+    assert header == "embed;dur=12.3, llm;dur=1500.0, total;dur=2000.0"
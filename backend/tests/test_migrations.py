@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, inspect, text
+from backend.app.core.migrations import MIGRATIONS, applied_versions, run_migrations
+from backend.app.models.database import Base
+
+def test_migrates_an_old_database(engine):
+    """
+    Tests upgrading a database created before the session stats, summaries and indexes.
+    """
+    # 1. The original schema, with some data in it
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR, hashed_password VARCHAR, is_active BOOLEAN, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE sessions (id VARCHAR PRIMARY KEY, user_id INTEGER, is_anonymous BOOLEAN, created_at DATETIME, last_activity DATETIME)"))
+        conn.execute(text("CREATE TABLE chat_messages (id INTEGER PRIMARY KEY, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL, created_at DATETIME)"))
+        conn.execute(text("INSERT INTO sessions (id, is_anonymous) VALUES ('s1', 1), ('s2', 1)"))
+        conn.execute(text("INSERT INTO chat_messages (session_id, role, content, created_at) VALUES "
+                          "('s1', 'user', 'How do I reset my password?', '2024-01-01 10:00:00'), "
+                          "('s1', 'assistant', 'Like this.', '2024-01-01 10:00:05')"))
+
+    # 2. Same startup path as the app: create_all, then migrate
+    Base.metadata.create_all(bind=engine)
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+
+    columns = {col["name"] for col in inspect(engine).get_columns("sessions")}
+    assert {"message_count", "preview", "last_message_at", "summary", "summary_through_id"} <= columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("chat_messages")}
+    assert "ix_chat_messages_session_id" in indexes
+    assert "ix_sessions_user_activity" in {index["name"] for index in inspect(engine).get_indexes("sessions")}
+
+    # 3. Existing sessions got their stats backfilled
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, message_count FROM sessions")).all())
+        preview = conn.execute(text("SELECT preview FROM sessions WHERE id = 's1'")).scalar()
+    assert rows == {"s1": 2, "s2": 0}
+    assert preview == "How do I reset my password?"
+
+    # 4. Running again is a no-op
+    assert run_migrations(engine) == []
+    assert applied_versions(engine) == [version for version, _, _ in MIGRATIONS]
+
+def test_fresh_database(engine):
+    """
+    Tests that migrations are recorded on a fresh database without changing it.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+def test_workers_starting_together(tmp_path):
+    """
+    Tests that migrations racing from several processes each get applied exactly once.
+    """
+    url = f"sqlite:///{tmp_path / 'chat.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sessions (id VARCHAR PRIMARY KEY, user_id INTEGER, is_anonymous BOOLEAN, created_at DATETIME, last_activity DATETIME)"))
+        conn.execute(text("CREATE TABLE chat_messages (id INTEGER PRIMARY KEY, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL, created_at DATETIME)"))
+
+    # One engine per "worker", all on the same file
+    engines = [create_engine(url, connect_args={"timeout": 30}) for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(run_migrations, engines))
+
+    # 1. Nobody crashed and every version was applied by exactly one worker
+    applied = sorted(version for result in results for version in result)
+    assert applied == [version for version, _, _ in MIGRATIONS]
+    assert applied_versions(engine) == applied
+    for e in engines + [engine]:
+        e.dispose()
@@ -0,0 +1,75 @@
+from backend.app.services.session_service import SessionService
+
+def test_history_keyset_pagination(db):
+    """
+    Tests paging through history from the newest messages back, and forward again.
+    """
+    service = SessionService(db)
+    session_id = service.create_anonymous_session()
+    ids = [service.save_message(session_id, "user", f"message {i}") for i in range(7)]
+    
+    # 1. No cursor gives the newest messages, oldest first
+    page = service.get_chat_history_page(session_id, limit=3)
+    assert [m["id"] for m in page["messages"]] == ids[4:]
+    assert page["has_more"] is True
+    
+    # 2. Page back with before
+    page = service.get_chat_history_page(session_id, limit=3, before=page["next_before"])
+    assert [m["id"] for m in page["messages"]] == ids[1:4]
+    page = service.get_chat_history_page(session_id, limit=3, before=page["next_before"])
+    assert [m["id"] for m in page["messages"]] == ids[:1]
+    assert page["has_more"] is False
+    
+    # 3. Page forward with after
+    page = service.get_chat_history_page(session_id, limit=4, after=ids[0])
+    assert [m["id"] for m in page["messages"]] == ids[1:5]
+    assert page["has_more"] is True
+
+def test_session_stats_and_sidebar_pages(db):
+    """
+    Tests that save_message keeps the session stats and the sidebar pages through sessions.
+    """
+    service = SessionService(db)
+    session_ids = [service.create_user_session(user_id=1) for _ in range(3)]
+    
+    service.save_message(session_ids[0], "assistant", "Hi, how can I help?")
+    service.save_message(session_ids[0], "user", "What are the fees for international transfers to Europe?")
+    service.save_message(session_ids[0], "user", "Second question")
+    
+    # 1. Count and preview come off the session row
+    info = service.get_session_info(session_ids[0])
+    assert info["message_count"] == 3
+    
+    # 2. Pages don't overlap and cover every session
+    first = service.get_user_sessions_with_preview(1, limit=2)
+    assert len(first["sessions"]) == 2
+    assert first["has_more"] is True
+    second = service.get_user_sessions_with_preview(1, limit=2, cursor=first["next_cursor"])
+    assert second["has_more"] is False
+    
+    all_sessions = first["sessions"] + second["sessions"]
+    assert sorted(s["session_id"] for s in all_sessions) == sorted(session_ids)
+    
+    by_id = {s["session_id"]: s for s in all_sessions}
+    assert by_id[session_ids[0]]["preview"] == "What are the fees for international transfers to E..."
+    assert by_id[session_ids[1]]["preview"] == "New Chat"
+    assert by_id[session_ids[1]]["message_count"] == 0
+
+def test_record_turn(db):
+    """
+    Tests saving a user message and its reply together.
+    """
+    service = SessionService(db)
+    session_id = service.create_anonymous_session()
+    
+    # 1. Both messages land in order, with the stats bumped once each
+    user_id, assistant_id = service.record_turn(session_id, "Hi", "Hello!")
+    assert assistant_id > user_id
+    history = service.get_chat_history(session_id)
+    assert [(m["role"], m["content"]) for m in history] == [("user", "Hi"), ("assistant", "Hello!")]
+    assert service.get_session_info(session_id)["message_count"] == 2
+    
+    # 2. A turn without a reply only saves the user message
+    user_id, assistant_id = service.record_turn(session_id, "Anyone there?")
+    assert assistant_id is None
+    assert service.get_session_info(session_id)["message_count"] == 3
@@ -0,0 +1,26 @@
+from backend.app.services.user_service import UserService, cached_principal, get_principal_cache
+
+def test_principal_cache_invalidation(db):
+    """
+    Tests that principals are cached and dropped when a user is deactivated or changes password.
+    """
+    get_principal_cache().clear()
+    service = UserService(db)
+    user, _ = service._add_user("someone@example.com", "not-a-real-hash")
+    
+    # 1. Loading caches it
+    principal = service.load_principal(user.id)
+    assert principal.is_active is True
+    assert cached_principal(user.id) == principal
+    
+    # 2. Deactivating drops it
+    user.is_active = False
+    db.commit()
+    assert cached_principal(user.id) is None
+    assert service.load_principal(user.id).is_active is False
+    
+    # 3. So does a password change
+    user.hashed_password = "another-hash"
+    db.commit()
+    assert cached_principal(user.id) is None
+
@@ -0,0 +1,67 @@
+import numpy as np
+from backend.app.core.vector_backends import NumpyBackend
+
+def test_numpy_backend_query_order(tmp_path):
+    """
+    Tests that the local backend returns the closest vectors first.
+    """
+    backend = NumpyBackend(str(tmp_path), dimension=3)
+    backend.upsert(
+        ["a", "b", "c"],
+        np.array([[1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32),
+        [{"text": "a"}, {"text": "b"}, {"text": "c"}]
+    )
+    backend.flush()
+    
+    results = backend.query(np.array([1, 0.1, 0], dtype=np.float32), top_k=2)
+    
+    # 1. Only top_k results come back
+    assert len(results) == 2
+    
+    # 2. Best match first, with cosine scores
+    assert [r["id"] for r in results] == ["a", "c"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["metadata"] == {"text": "a"}
+
+def test_numpy_backend_upsert_and_reload(tmp_path):
+    """
+    Tests that upserting an existing id replaces it and the index survives a reload.
+    """
+    backend = NumpyBackend(str(tmp_path), dimension=2)
+    backend.upsert(["a", "b"], np.array([[1, 0], [0, 1]]), [{"v": 1}, {"v": 2}])
+    backend.flush()
+    backend.upsert(["a"], np.array([[0, 1]]), [{"v": 3}])
+    
+    # Not searchable until flushed
+    assert backend.query(np.array([1, 0]), top_k=1)[0]["metadata"]["v"] == 1
+    backend.flush()
+    
+    # 1. Replaced, not duplicated
+    assert len(backend) == 2
+    
+    # 2. A fresh instance reads the same index from disk
+    reloaded = NumpyBackend(str(tmp_path), dimension=2)
+    results = reloaded.query(np.array([0, 1]), top_k=5)
+    assert len(results) == 2
+    assert {r["metadata"]["v"] for r in results} == {2, 3}
+    assert results[0]["score"] == results[1]["score"]
+
+def test_numpy_backend_sees_other_writers(tmp_path):
+    """
+    Tests that a running instance picks up a flush from another one, and old versions get cleaned up.
+    """
+    server = NumpyBackend(str(tmp_path), dimension=2)
+    assert len(server) == 0
+    
+    sync = NumpyBackend(str(tmp_path), dimension=2)
+    for i in range(3):
+        sync.upsert([f"doc{i}"], np.array([[1, i]]), [{"v": i}])
+        sync.flush()
+    
+    # 1. The other instance re-maps the new version on its next read
+    assert len(server) == 3
+    assert server.query(np.array([1, 2]), top_k=1)[0]["id"] == "doc2"
+    
+    # 2. Only the current version and the one before it are kept
+    versions = [p for p in tmp_path.iterdir() if p.name.startswith(NumpyBackend.VERSION_PREFIX)]
+    assert len(versions) == 2
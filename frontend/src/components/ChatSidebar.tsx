@@ -33,27 +33,32 @@ export default function ChatSidebar({
 }: ChatSidebarProps) {
   const [sessions, setSessions] = useState<ChatSession[]>([])
   const [loading, setLoading] = useState(false)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
 
   useEffect(() => {
     if (isAuthenticated && authToken) {
       loadUserSessions()
     } else {
       setSessions([])
+      setNextCursor(null)
     }
   }, [isAuthenticated, authToken])
 
-  async function loadUserSessions() {
+  async function loadUserSessions(cursor?: string) {
     if (!authToken) return
     
     setLoading(true)
     try {
-      const response = await fetch(`${API_BASE}/api/sessions/my-chats`, {
+      // Sessions come a page at a time, the cursor fetches the next page
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+      const response = await fetch(`${API_BASE}/api/sessions/my-chats${query}`, {
         headers: { 'Authorization': `Bearer ${authToken}` }
       })
       
       if (response.ok) {
         const data = await response.json()
-        setSessions(data.sessions)
+        setSessions(prev => cursor ? [...prev, ...data.sessions] : data.sessions)
+        setNextCursor(data.next_cursor)
       }
     } catch (error) {
       console.error('Error loading user sessions:', error)
@@ -149,7 +154,7 @@ export default function ChatSidebar({
                   Create an account to save and access your conversation history across devices.
                 </p>
               </div>
-            ) : loading ? (
+            ) : loading && sessions.length === 0 ? (
               <div className="p-6 text-center">
                 <div className="inline-flex items-center gap-2 text-gray-400">
                   <div className="w-4 h-4 border-2 border-gray-400 border-t-transparent rounded-full animate-spin"></div>
@@ -222,6 +227,16 @@ export default function ChatSidebar({
                     )}
                   </div>
                 ))}
+
+                {nextCursor && (
+                  <button
+                    onClick={() => loadUserSessions(nextCursor)}
+                    disabled={loading}
+                    className="w-full p-2 text-xs text-gray-400 hover:text-purple-300 transition-colors disabled:opacity-50"
+                  >
+                    {loading ? 'Loading...' : 'Load older conversations'}
+                  </button>
+                )}
               </div>
             )}
           </div>
@@ -232,7 +247,7 @@ export default function ChatSidebar({
           <div className="p-4 border-t border-gray-800">
             <div className="text-xs text-gray-500 text-center">
               {isAuthenticated 
-                ? `${sessions.length} conversation${sessions.length !== 1 ? 's' : ''} saved`
+                ? `${sessions.length}${nextCursor ? '+' : ''} conversation${sessions.length !== 1 ? 's' : ''} saved`
                 : 'Sign in to save conversations'
               }
             </div>